@@ -40,8 +40,10 @@ class MyCommunity(Community, PeerObserver):
 
     def send_transaction(self, tx_message: TransactionMessage):
         print("Sending transaction. Nonce:", tx_message.nonce)
+        # Sign and serialize once, reuse the packet for every peer
+        packet = self.ezr_pack(tx_message.msg_id, tx_message)
         for peer in self.get_peers():
-            self.ez_send(peer, tx_message)
+            self.endpoint.send(peer.address, packet)
 
     def on_peer_added(self, peer: Peer) -> None:
         print("I am:", self.my_peer, "I found:", peer)
@@ -0,0 +1,140 @@
+"""
+Sign and verify throughput per key type.
+
+Signs and verifies the canonical bet encoding (`BetPayload._encode`) with
+each IPv8 key type, and a 16-bet batch, then prints operations per second
+and the signature and key overhead each bet carries, as JSON. Also packs
+the largest block of full batches the miner would make, and exits 1 when
+that block does not fit in one UDP datagram.
+
+    python benchmark_signing.py
+    python benchmark_signing.py --count 2000 --key-types medium curve25519
+"""
+
+import argparse
+import json
+import time
+
+import sys
+
+from ipv8.keyvault.crypto import default_eccrypto
+from ipv8.messaging.serialization import default_serializer
+
+from constant import (
+    DEFAULT_DIFFICULTY,
+    MAX_BATCH_BETS,
+    MAX_BLOCK_TRANSACTIONS,
+    MAX_DATAGRAM_BYTES,
+)
+from manager.blockchain import BlockChain
+from messages.betbatch import BetBatchPayload
+from messages.betpayload import BetPayload
+from messages.block import Block
+from messages.signing import KEY_TYPES, sign, verify
+
+
+# Community prefix and message id, key length, global time
+_MESSAGE_HEADER_BYTES = 22 + 1 + 2 + 8
+
+
+def _rate(count: int, seconds: float) -> float:
+    return count / seconds if seconds else 0.0
+
+
+def full_block(key, bettor_id: str) -> dict:
+    """The datagram of the fullest block `prepare_block` makes of 16-bet batches."""
+    chain = BlockChain()
+    chain.chain.append(Block(0, 0.0, [], "0", "0" * 64, 1, 0, DEFAULT_DIFFICULTY, []))
+    for i in range(MAX_BLOCK_TRANSACTIONS + 1):
+        batch = BetBatchPayload(
+            bettor_id,
+            [100] * MAX_BATCH_BETS,
+            [100] * MAX_BATCH_BETS,
+            1_700_000_000.0 + i,
+            "",
+        )
+        batch.signature = sign(key, batch)
+        chain.mempool.add_transaction(batch.txid, batch)
+    block = chain.prepare_block()
+    block.hash, block.nonce = "0" * 64, 2**63 - 1
+    datagram = (
+        _MESSAGE_HEADER_BYTES
+        + len(key.pub().key_to_bin())
+        + len(default_serializer.pack_serializable(block))
+        + key.get_signature_length()
+    )
+    return {
+        "full_block_batches": len(block.batches),
+        "full_block_bytes": datagram,
+        "full_block_fits_datagram": datagram <= MAX_DATAGRAM_BYTES,
+    }
+
+
+def bench_key_type(key_type: str, count: int) -> dict:
+    key = default_eccrypto.generate_key(key_type)
+    bettor_id = key.pub().key_to_bin().hex()
+    bets = [
+        BetPayload(bettor_id, i % 100 + 1, 10, 1_700_000_000.0 + i, "")
+        for i in range(count)
+    ]
+    batch_size = MAX_BATCH_BETS
+    batches = [
+        BetBatchPayload(
+            bettor_id,
+            [n % 100 + 1 for n in range(i, i + batch_size)],
+            [10] * batch_size,
+            1_700_000_000.0 + i,
+            "",
+        )
+        for i in range(max(1, count // batch_size))
+    ]
+
+    started = time.perf_counter()
+    for payload in bets:
+        payload.signature = sign(key, payload)
+    sign_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    valid = sum(verify(payload) for payload in bets)
+    verify_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for payload in batches:
+        payload.signature = sign(key, payload)
+        verify(payload)
+    batch_seconds = time.perf_counter() - started
+
+    signature_bytes = len(bets[0].signature) // 2
+    return {
+        "sign_per_sec": _rate(count, sign_seconds),
+        "verify_per_sec": _rate(count, verify_seconds),
+        "all_valid": valid == count,
+        "public_key_bytes": len(bettor_id) // 2,
+        "signature_bytes": signature_bytes,
+        # Hex on the wire, key and signature in every single bet
+        "overhead_bytes_per_bet": len(bettor_id) + signature_bytes * 2,
+        "batched_bets_per_sec": _rate(len(batches) * batch_size, batch_seconds),
+        "overhead_bytes_per_batched_bet": (len(bettor_id) + signature_bytes * 2)
+        / batch_size,
+        **full_block(key, bettor_id),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=1000, help="bets per key type")
+    parser.add_argument(
+        "--key-types", nargs="+", choices=KEY_TYPES, default=list(KEY_TYPES)
+    )
+    args = parser.parse_args()
+
+    report = {
+        key_type: bench_key_type(key_type, args.count) for key_type in args.key_types
+    }
+    print(json.dumps(report, indent=2))
+    if not all(result["full_block_fits_datagram"] for result in report.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
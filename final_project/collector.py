@@ -0,0 +1,35 @@
+"""
+Local telemetry collector.
+
+Nodes started with `--telemetry <socket>` stream peer discovery and
+transaction events here instead of writing data/node_N files. Everything is
+merged into one time-ordered columnar log (one JSON line of columns per
+second) that the reporting scripts read with --telemetry.
+
+    python collector.py
+    python collector.py --socket /tmp/axiom.sock --output data/telemetry.log
+"""
+
+import argparse
+import asyncio
+
+from utils.telemetry import TelemetryCollector
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--socket", default="/tmp/axiom-telemetry.sock")
+    parser.add_argument("--output", default="data/telemetry.log")
+    args = parser.parse_args()
+
+    collector = TelemetryCollector(args.socket, args.output)
+    print(f"[i] collecting on {args.socket} → {args.output}")
+    try:
+        asyncio.run(collector.serve())
+    except KeyboardInterrupt:
+        pass
+    print(f"[i] {collector.received} events received, {collector.written} written")
+
+
+if __name__ == "__main__":
+    main()
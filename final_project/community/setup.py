@@ -1,10 +1,15 @@
 import random
-import time
-from dataclasses import asdict
+from dataclasses import asdict, replace
 import json
 import asyncio
+import logging
+import signal
+import struct
+import threading
+import time
 
 
+from aiohttp import web
 from ipv8.community import Community
 from ipv8.peerdiscovery.network import PeerObserver
 from ipv8.types import Peer
@@ -12,18 +17,86 @@ from ipv8_service import IPv8
 from ipv8.lazy_community import lazy_wrapper
 
 from db.mempool import Mempool
-from manager.blockchain import BlockChain
+from manager.block_scheduler import BlockScheduler
+from manager.blockchain import BlockChain, winning_result
+from manager.peer_table import PeerEntry, PeerTable
+from manager.settlement import SettlementStage
 
 
+from messages.betbatch import BetBatchPayload
 from messages.betpayload import BetPayload
+from messages.signing import sign
 from messages.transaction import TransactionsRequest, TransactionsResponse
-from messages.block import Block
+from messages.block import Block, BlocksRequest
+from messages.pool import JobClosed, MiningJob, MiningResult, PoolJoin
 from messages.result import LotteryResult
+from messages.view import PeerView
+from pow.miner import search
+from pow.pool import MiningPool
 
 from utils.discovery_log import PeerDiscoveryTracker
 from utils.transaction_log import TxCoverageTracker
-
-from constant import BLOCKS_PER_ROUND
+from utils.seen_cache import SeenCache
+from utils.trace import TraceWriter
+from utils.metrics import NodeMetrics, start_metrics_server
+from utils.profiler import StackSampler, folded, sample_in_background
+from utils.watchdog import LoopWatchdog
+from utils.load_generator import LoadGenerator
+from utils.telemetry import TelemetryClient
+from utils.memory import MemorySnapshots, component_report
+from utils import clock
+
+from constant import (
+    BLOCKS_PER_ROUND,
+    GOSSIP_DEGREE,
+    GOSSIP_MAX_HOPS,
+    GOSSIP_SEEN_CACHE_SIZE,
+    GOSSIP_RESAMPLE_INTERVAL,
+    CATCHUP_INTERVAL,
+    CATCHUP_BATCH,
+    SYNC_FANOUT,
+    FETCH_REQUEST_TTL,
+    MAX_DATAGRAM_BYTES,
+    LOOP_LAG_THRESHOLD,
+    LOOP_WATCHDOG_INTERVAL,
+    PROFILE_SECONDS,
+    MEMORY_WALK_LIMIT,
+    NETWORK_CHECK_INTERVAL,
+    NETWORK_STABLE_SECONDS,
+    NETWORK_QUORUM,
+    NETWORK_READY_TIMEOUT,
+    PEER_VIEW_INTERVAL,
+    PEER_VIEW_TTL,
+    LOAD_BURST_PERIOD,
+    LOAD_DURATION,
+    SETTLEMENT_CONFIRMATIONS,
+    COMPETITIVE_MINING_SPREAD,
+    DEFAULT_DIFFICULTY,
+    TRACE_FLUSH_INTERVAL,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def compute_result(round_number: int, round_blocks: list, replaces):
+    """
+    Executor thread: the winners of a round snapshot, as a JSON winner list
+    and a lottery_results.jsonl record. Everything comes in as arguments, so
+    nothing the loop changes is read here. A reorged round gets a second
+    record whose `replaces` names the last block of the one it supersedes
+    """
+    lottery_result, total_amount, winner_list = winning_result(round_blocks)
+    record = {
+        "round": round_number,
+        "winning_number": lottery_result,
+        "total_amount": total_amount,
+        "winners": winner_list,
+        "last_block": round_blocks[-1].hash if round_blocks else "",
+        "replaces": replaces,
+    }
+    winners = json.dumps(winner_list)
+    return lottery_result, total_amount, winners, json.dumps(record) + "\n"
 
 
 class MyCommunity(Community, PeerObserver):
@@ -32,54 +105,147 @@ class MyCommunity(Community, PeerObserver):
     def __init__(self, settings) -> None:
         super().__init__(settings)
 
-        # Connected Peers
-        self._connected_peers = set()
-        self.latest_tx_timestamps = (
-            {}
-        )  # Track the latest timestamp received from each peer
-        self._known_peers = set()  # Keep track of all discovered peers
+        # Connected Peers, with their ids and sync watermarks derived once
+        self.peer_table = PeerTable(self.my_peer)
+        # request_id -> (peer mid, send time) for outstanding transaction pulls
+        self._pending_requests = {}
+        self._request_counter = 0
+        # Role view: the highest and lowest key known across the network, built
+        # from our peers and the views they send. mid -> (PeerView, received at)
+        self._peer_views = {}
+        self._view = None
+        self.miner_key = self.peer_table.my_key_hex
+        self.broadcaster_key = self.peer_table.my_key_hex
 
         # Connections
         self.tx_mempool = Mempool()
-        self.chain = BlockChain()
+        # "competitive": every node mines on the heaviest tip it knows
+        # "pool": the designated miner farms nonce ranges out to the other nodes
+        self.mining_mode = getattr(settings, "mining_mode", "single")
+        self.competitive_mining = self.mining_mode == "competitive"
+        # Leading hex zeros per block, the same on every node
+        self.difficulty = getattr(settings, "difficulty", DEFAULT_DIFFICULTY)
+        # Every mode keeps the block tree: blocks that arrive out of order wait
+        # for their parent and a node on a stray genesis can switch over
+        self.chain = BlockChain(
+            self.tx_mempool,
+            fork_choice=True,
+            difficulty=self.difficulty,
+        )
 
-        # Mining
+        # Mining, `is_miner` is the designated miner, which also makes genesis
         self.is_miner = False
+        # round → hash of its last block, for rounds settled at confirmation depth
+        self._settled_rounds = {}
+        # Only competing miners fork routinely, a single miner's round is final
+        self.settlement_confirmations = (
+            SETTLEMENT_CONFIRMATIONS if self.competitive_mining else 0
+        )
+        # (peer mid, start height) → send time of outstanding catch-up requests
+        self._block_requests = {}
+        # round → last block hash of the result settled here, and of the latest
+        # one received. A reorged round's result replaces the earlier one
+        self._lottery_results = {}
+        self._received_results = {}
+        # Pool mining: ranges handed out when designated, else the job searched
+        self.pool = MiningPool() if self.mining_mode == "pool" else None
+        self._pool_job = None
+        # Cuts a block on size, age of the oldest bet or the round deadline
+        self.block_scheduler = BlockScheduler(
+            lambda: len(self.tx_mempool._mempool),
+            lambda: self.tx_mempool.oldest_arrival(),
+        )
+        # Next block, prepared while the previous one goes out
+        self._template = None
+        self._template_version = None
 
-        # Network Establishment
+        # Network Establishment: ready once a quorum of peers sent its view and
+        # the roles it names are stable, or after the timeout without a quorum
         self.network_established = False
-        # Time to wait for peers (adjust as needed)
-        self.establishment_timeout = 10.0
-        self.establishment_start_time = time.time()
+        self.network_quorum = getattr(settings, "network_quorum", NETWORK_QUORUM)
+        # Size of a known membership (static bootstrap), reaching it is enough
+        self.expected_peers = getattr(settings, "expected_peers", None)
+        self.establishment_timeout = NETWORK_READY_TIMEOUT
+        self.establishment_start_time = clock.now()
+        self.network_ready_at = None
+        self._view_stable_since = self.establishment_start_time
 
         # Broadcast
         self.is_lottery_broadcaster = False
+        # Closed rounds are settled here, away from block handling
+        self.settlement = SettlementStage(self.broadcast_lottery)
+        self.results_path = f"data/{settings.node_id}/lottery_results.jsonl"
+
+        # Gossip overlay: bounded neighbour set instead of a full mesh
+        self.gossip_degree = getattr(settings, "gossip_degree", GOSSIP_DEGREE)
+        self._neighbours = set()
+        self._seen_messages = SeenCache(GOSSIP_SEEN_CACHE_SIZE)
 
         # Utils
         self.node_id = settings.node_id
-        self.peer_discovery_tracker = PeerDiscoveryTracker(self.node_id)
-        self.tx_tracker = TxCoverageTracker(self.node_id)
+        # Events go to a shared collector when one is configured, else to files
+        telemetry_socket = getattr(settings, "telemetry_socket", None)
+        self.telemetry = None
+        if telemetry_socket:
+            self.telemetry = TelemetryClient(telemetry_socket, self.node_id)
+            self.register_task("telemetry", self.telemetry.run)
+        self.peer_discovery_tracker = PeerDiscoveryTracker(
+            self.node_id, telemetry=self.telemetry
+        )
+        self.tx_tracker = TxCoverageTracker(self.node_id, telemetry=self.telemetry)
+
+        # Optional record of every inbound message, for offline replay
+        trace_path = getattr(settings, "trace_path", None)
+        self.trace_writer = TraceWriter(trace_path) if trace_path else None
+        if self.trace_writer is not None:
+            self.register_task(
+                "flush_trace", self.trace_writer.flush, interval=TRACE_FLUSH_INTERVAL
+            )
+
+        # Bets per generated transaction, more than one makes a signed batch
+        self.bets_per_transaction = getattr(settings, "bets_per_transaction", 1)
+
+        # Optional stress load in place of the one bet every 5 seconds
+        load_tps = getattr(settings, "load_tps", None)
+        self.load_generator = None
+        if load_tps:
+            self.load_generator = LoadGenerator(
+                self._make_transaction,
+                self._submit_bet,
+                lambda: len(self.tx_mempool._mempool),
+                load_tps,
+                getattr(settings, "load_profile", "steady"),
+                getattr(settings, "load_duration", LOAD_DURATION),
+                LOAD_BURST_PERIOD,
+                getattr(settings, "load_seed", None),
+                self.bets_per_transaction,
+            )
 
         # Tasks
         self.register_task(
             "ensure_full_connectivity",
             self.ensure_full_connectivity,
-            interval=5.0,
-            delay=3.0,
+            interval=NETWORK_CHECK_INTERVAL,
         )
 
+        self.register_task("share_view", self.share_view, interval=PEER_VIEW_INTERVAL)
+
+        self.register_task("settlement", self.settlement.run)
+
         self.register_task(
-            "request_transactions", self.request_transactions, interval=5.0, delay=1.0
+            "resample_neighbours",
+            self._resample_neighbours,
+            interval=GOSSIP_RESAMPLE_INTERVAL,
         )
+        self.register_task("catch_up", self.catch_up, interval=CATCHUP_INTERVAL)
 
         self.register_task(
-            "select_lottery_broadcaster",
-            self.select_lottery_broadcaster,
-            delay=10.0,  # Stagger the selection slightly
+            "request_transactions", self.request_transactions, interval=5.0, delay=1.0
         )
 
         # For Block messages
         self.add_message_handler(Block, self.on_block)
+        self.add_message_handler(BlocksRequest, self.on_blocks_request)
 
         # For Syncing Mempools
         self.add_message_handler(TransactionsRequest, self.on_get_transactions_request)
@@ -87,101 +253,433 @@ class MyCommunity(Community, PeerObserver):
 
         # For Betpayload
         self.add_message_handler(BetPayload, self.on_transaction_message)
+        self.add_message_handler(BetBatchPayload, self.on_batch_message)
 
         # For Lottery
         self.add_message_handler(LotteryResult, self.on_lottery_result)
 
+        # For Role Selection
+        self.add_message_handler(PeerView, self.on_peer_view)
+
+        # For Pool Mining
+        self.add_message_handler(PoolJoin, self.on_pool_join)
+        self.add_message_handler(MiningJob, self.on_mining_job)
+        self.add_message_handler(MiningResult, self.on_mining_result)
+        self.add_message_handler(JobClosed, self.on_job_closed)
+
+        # Metrics: every handler above is counted and timed
+        self.metrics = NodeMetrics()
+        for payload_cls in (
+            Block,
+            BlocksRequest,
+            TransactionsRequest,
+            TransactionsResponse,
+            BetPayload,
+            BetBatchPayload,
+            LotteryResult,
+            PoolJoin,
+            MiningJob,
+            MiningResult,
+            JobClosed,
+            PeerView,
+        ):
+            msg_id = payload_cls.msg_id
+            self.decode_map[msg_id] = self.metrics.instrument(
+                payload_cls.__name__, self.decode_map[msg_id]
+            )
+        self._register_gauges()
+
+        # Event loop watchdog, started with the node (off in the simulator)
+        self._loop_thread_id = threading.get_ident()
+        self.watchdog = None
+        if getattr(settings, "loop_watchdog", True):
+            self.watchdog = LoopWatchdog(LOOP_LAG_THRESHOLD, LOOP_WATCHDOG_INTERVAL)
+            self.metrics.histogram(
+                "axiom_loop_lag_seconds",
+                "Event loop scheduling lag",
+                self.watchdog.lag,
+            )
+            self.metrics.counter(
+                "axiom_loop_stalls_total",
+                "Times the loop was blocked past the threshold",
+                lambda: self.watchdog.stall_count,
+            )
+        self.metrics_port = getattr(settings, "metrics_port", None)
+        self._metrics_runner = None
+        self.memory_snapshots = MemorySnapshots()
+        if self.metrics_port:
+            self.register_task("start_metrics_server", self._start_metrics_server)
+
         # Task to generate transactions, will be started conditionally
         self.generate_tx_task = None
 
-        # Initial call to start the mining cycle if this node is the initial miner
-        self.register_task("mine_and_broadcast", self._mine_and_broadcast, delay=10)
+        # Mining loop, idles until this node may mine and a block is due
+        self.register_task("mine_and_broadcast", self._mine_and_broadcast)
+
+    # Metrics
+
+    def _register_gauges(self) -> None:
+        # Read through self at scrape time, the chain may be swapped out
+        self.metrics.gauge(
+            "axiom_mempool_size",
+            "Transactions waiting in the mempool",
+            lambda: len(self.tx_mempool._mempool),
+        )
+        self.metrics.gauge(
+            "axiom_chain_height",
+            "Blocks in the local chain",
+            lambda: self.chain._get_length(),
+        )
+        self.metrics.gauge(
+            "axiom_peers", "Peers in the peer table", lambda: len(self.peer_table)
+        )
+        self.metrics.gauge(
+            "axiom_sync_lag_seconds",
+            "Age of the newest transaction pulled from any peer",
+            self._sync_lag,
+        )
+        self.metrics.gauge(
+            "axiom_sync_pending_requests",
+            "Transaction requests awaiting a response",
+            lambda: len(self._pending_requests),
+        )
+        self.metrics.gauge(
+            "axiom_mining_hash_rate",
+            "Hashes per second of the last mined block",
+            lambda: self.chain.miner.last_hash_rate,
+        )
+        self.metrics.counter(
+            "axiom_mining_hashes_total",
+            "Hashes computed",
+            lambda: self.chain.miner.total_hashes,
+        )
+        self.metrics.counter(
+            "axiom_mining_seconds_total",
+            "Time spent mining",
+            lambda: self.chain.miner.total_seconds,
+        )
+        self.metrics.counter(
+            "axiom_blocks_mined_total",
+            "Blocks mined here",
+            lambda: self.chain.miner.blocks_mined,
+        )
+        self.metrics.counter(
+            "axiom_chain_reorgs_total",
+            "Times a heavier branch replaced blocks of the main chain",
+            lambda: self.chain.reorgs,
+        )
+        self.metrics.gauge(
+            "axiom_pool_workers",
+            "Peers that joined this node's mining pool",
+            lambda: len(self.pool.workers) if self.pool else 0,
+        )
+        self.metrics.counter(
+            "axiom_pool_hashes_total",
+            "Hashes reported by pool workers",
+            lambda: self.pool.worker_hashes() if self.pool else 0,
+        )
+        self.metrics.gauge(
+            "axiom_settlement_pending",
+            "Closed rounds waiting to be settled",
+            self.settlement.pending,
+        )
+        self.metrics.gauge(
+            "axiom_settlement_delay_seconds",
+            "Time from round close to settled, last round",
+            lambda: self.settlement.last_delay,
+        )
+
+    def _sync_lag(self) -> float:
+        newest = max((e.last_seen_timestamp for e in self.peer_table), default=0.0)
+        return clock.now() - newest if newest else 0.0
+
+    def _observe_new_block(self, blocks=None) -> None:
+        if self.load_generator is not None:
+            for block in blocks or self.chain.chain[-1:]:
+                self.load_generator.observe_block(block.transactions + block.batches)
+        self.block_scheduler.block_added(self.chain._get_length())
+        if self.chain._get_length() >= 2:
+            latest, previous = self.chain.chain[-1], self.chain.chain[-2]
+            self.metrics.block_interval.observe(latest.timestamp - previous.timestamp)
+
+    async def _start_metrics_server(self) -> None:
+        self._metrics_runner = await start_metrics_server(
+            self.metrics,
+            self.metrics_port,
+            routes=[
+                ("/debug/profile", self._handle_profile_request),
+                ("/debug/stalls", self._handle_stalls_request),
+                ("/debug/memory", self._handle_memory_request),
+                ("/debug/memory/snapshot", self._handle_memory_snapshot_request),
+                ("/debug/load", self._handle_load_request),
+            ],
+        )
+        print(
+            f"{self.my_peer.address.port}: Metrics on http://127.0.0.1:{self.metrics_port}/metrics"
+        )
+
+    # Profiling
+
+    def _profile_to_file(self) -> None:
+        """SIGUSR1: sample the loop thread for a while and write folded stacks."""
+        path = f"data/{self.node_id}/profile-{int(time.time())}.folded"
+        print(f"{self.my_peer.address.port}: Profiling for {PROFILE_SECONDS}s → {path}")
+        sample_in_background(self._loop_thread_id, PROFILE_SECONDS, path)
+
+    async def _handle_profile_request(self, request):
+        """GET /debug/profile?seconds=N → folded stacks for flamegraph.pl / speedscope."""
+        seconds = float(request.query.get("seconds", PROFILE_SECONDS))
+        sampler = StackSampler(self._loop_thread_id)
+        loop = asyncio.get_running_loop()
+        stacks = await loop.run_in_executor(None, sampler.sample, seconds)
+        return web.Response(text=folded(stacks))
+
+    async def _handle_stalls_request(self, request):
+        if self.watchdog is None:
+            return web.Response(text="watchdog disabled\n")
+        text = "".join(
+            f"--- {stall.blocked_for * 1000:.0f}ms at {stall.at:.3f}\n{stall.stack}\n"
+            for stall in self.watchdog.stalls
+        )
+        return web.Response(text=text)
+
+    async def _handle_load_request(self, request):
+        if self.load_generator is None:
+            return web.json_response({"load": "disabled"})
+        return web.json_response(self.load_generator.report())
+
+    # Memory
+
+    def memory_report(self) -> dict:
+        """Approximate live bytes and objects held by each long-lived structure."""
+        return component_report(
+            {
+                "mempool": self.tx_mempool._mempool,
+                "chain": self.chain.chain,
+                "block_tree": self.chain.tree.blocks if self.chain.tree else {},
+                "database": self.chain.db.blockchain_db,
+                "tx_tracker": self.tx_tracker._seen,
+                "peer_discovery": self.peer_discovery_tracker.data,
+                "peer_table": list(self.peer_table),
+            },
+            skip=(type(self.my_peer),),  # ipv8.types.Peer is only a type hint
+            limit=MEMORY_WALK_LIMIT,
+        )
+
+    async def _handle_memory_request(self, request):
+        # A long walk, so on an executor thread, the loop keeps handling
+        # messages and the figures are approximate while it does
+        loop = asyncio.get_running_loop()
+        return web.json_response(await loop.run_in_executor(None, self.memory_report))
+
+    async def _handle_memory_snapshot_request(self, request):
+        top = int(request.query.get("top", 25))
+        return web.Response(text=self.memory_snapshots.snapshot(top))
 
     # Peer Set up
 
     def on_peer_added(self, peer: Peer) -> None:
         # print("I am:", self.my_peer, "I found:", peer)
-        self.walk_to(peer.address)
         self.peer_discovery_tracker.update(self.my_peer.mid.hex(), peer.mid.hex())
-        self._connected_peers.add(peer)
-        # Track discovered peers
-        self._known_peers.add(peer.public_key.key_to_bin().hex())
-        # Initialize timestamp
-        self.latest_tx_timestamps[peer.public_key.key_to_bin().hex()] = 0.0
-        self._determine_miner()
+        self.peer_table.add(peer)
+        self._refresh_neighbours()
+        self._update_view()
+        if self.pool is not None and self.network_established and not self.is_miner:
+            self.ez_send(peer, PoolJoin(hash_rate=self.chain.miner.last_hash_rate))
 
     def on_peer_removed(self, peer: Peer) -> None:
-        peer_id = peer.public_key.key_to_bin().hex()
-        if peer in self._connected_peers:
-            self._connected_peers.remove(peer)
-        if peer_id in self.latest_tx_timestamps:
-            del self.latest_tx_timestamps[peer_id]
-        if peer_id in self._known_peers:
-            self._known_peers.remove(peer_id)
-        self._determine_miner()
-
-    def _determine_miner(self):
-        """Selects the miner based on the highest peer ID among connected peers."""
-        all_peers = list(self._connected_peers) + [self.my_peer]
-        if all_peers:
-            sorted_peers = sorted(
-                all_peers, key=lambda p: p.public_key.key_to_bin().hex(), reverse=True
+        entry = self.peer_table.remove(peer)
+        if self.pool is not None and entry is not None:
+            self.pool.leave(entry.key_hex)
+        self._neighbours.discard(peer)
+        self._peer_views.pop(peer.mid, None)
+        self._refresh_neighbours()
+        self._update_view()
+
+    def _refresh_neighbours(self):
+        """Tops the gossip neighbour set back up to the target degree with random peers."""
+        missing = self.gossip_degree - len(self._neighbours)
+        if missing <= 0:
+            return
+        candidates = [p for p in self.peer_table.peers() if p not in self._neighbours]
+        for peer in random.sample(candidates, min(missing, len(candidates))):
+            self._neighbours.add(peer)
+            self.walk_to(peer.address)
+
+    def _resample_neighbours(self):
+        """
+        Swaps one neighbour for a random other peer, so peers found after the
+        set filled up get picked too
+        """
+        outside = [p for p in self.peer_table.peers() if p not in self._neighbours]
+        if not outside or not self._neighbours:
+            return
+        dropped = random.choice(sorted(self._neighbours, key=lambda p: p.mid))
+        self._neighbours.discard(dropped)
+        self._refresh_neighbours()
+
+    def _add_incoming_neighbour(self, peer: Peer) -> None:
+        """A peer that relays to us gets our relays too, up to twice the degree."""
+        if peer in self.peer_table and len(self._neighbours) < 2 * self.gossip_degree:
+            self._neighbours.add(peer)
+
+    def _gossip_targets(self, exclude: Peer = None) -> list:
+        return [p for p in self._neighbours if p != exclude]
+
+    # Role Selection
+
+    def _compute_view(self) -> tuple:
+        """
+        (highest, hops, lowest, hops) over our key, our peers' keys and the
+        views peers sent within PEER_VIEW_TTL. A key from a view counts one hop
+        further than its sender, up to GOSSIP_MAX_HOPS, so the key of a node
+        that left is not passed back and forth for ever
+        """
+        # Among our peers, ours included: our own key is 0 hops away, theirs 1
+        my_key = self.peer_table.my_key_hex
+        top, bottom = self.peer_table.highest_id(), self.peer_table.lowest_id()
+        highest = [(top, int(top != my_key))]
+        lowest = [(bottom, int(bottom != my_key))]
+        for _, view in self._fresh_views():
+            if view.highest_hops < GOSSIP_MAX_HOPS:
+                highest.append((view.highest, view.highest_hops + 1))
+            if view.lowest_hops < GOSSIP_MAX_HOPS:
+                lowest.append((view.lowest, view.lowest_hops + 1))
+        # The same key over several paths keeps its shortest distance
+        return max(highest, key=lambda c: (c[0], -c[1])) + min(lowest)
+
+    def _fresh_views(self) -> list:
+        """(peer mid, view) for the views received within PEER_VIEW_TTL."""
+        cutoff = clock.now() - PEER_VIEW_TTL
+        return [
+            (mid, view)
+            for mid, (view, received) in self._peer_views.items()
+            if received >= cutoff and self.peer_table.get_by_mid(mid) is not None
+        ]
+
+    def _update_view(self) -> None:
+        """Recomputes the view, roles are selected again when it names others."""
+        self._view = self._compute_view()
+        roles = (self._view[0], self._view[2])
+        if roles == (self.miner_key, self.broadcaster_key):
+            return
+        self.miner_key, self.broadcaster_key = roles
+        self._view_stable_since = clock.now()
+        self._determine_roles()
+
+    def share_view(self) -> None:
+        self._update_view()
+        highest, highest_hops, lowest, lowest_hops = self._view
+        self.broadcast(
+            PeerView(
+                highest=highest,
+                highest_hops=highest_hops,
+                lowest=lowest,
+                lowest_hops=lowest_hops,
+                height=self.chain._get_length(),
+            ),
+            self.peer_table.peers(),
+        )
+
+    @lazy_wrapper(PeerView)
+    def on_peer_view(self, peer: Peer, payload: PeerView):
+        self._peer_views[peer.mid] = (payload, clock.now())
+        self._update_view()
+
+    def _determine_roles(self) -> None:
+        """The miner has the highest key in the view, the broadcaster the lowest."""
+        my_key = self.peer_table.my_key_hex
+        was_miner = self.is_miner
+        was_broadcaster = self.is_lottery_broadcaster
+        self.is_miner = self.miner_key == my_key
+        self.is_lottery_broadcaster = self.broadcaster_key == my_key
+        port = self.my_peer.address.port
+        if self.is_miner and not was_miner:
+            print(f"{port} is now the miner (highest peer ID).")
+        if self.is_lottery_broadcaster and not was_broadcaster:
+            print(f"{port} is the lottery broadcaster (lowest peer ID).")
+        if not self.network_established:
+            return
+        if self.is_miner and not was_miner:
+            self.register_anonymous_task("create_genesis", self._create_genesis)
+        elif was_miner and not self.is_miner and self.pool is not None:
+            self.broadcast(
+                PoolJoin(hash_rate=self.chain.miner.last_hash_rate),
+                self.peer_table.peers(),
             )
-            potential_miner = sorted_peers[0]
-            if potential_miner == self.my_peer:
-                if not self.is_miner:
-                    self.is_miner = True
-                    print(
-                        f"{self.my_peer.address.port} is now the miner (highest peer ID)."
-                    )
-                    # No need to start a continuous task here, _trigger_mining will handle it
-                # Keep can_mine True if still the miner
-            else:
-                if self.is_miner:
-                    self.is_miner = False
-        else:
-            self.is_miner = False
-            print(f"{self.my_peer.address.port}: No peers, not the miner.")
+
+    def _peer_height(self) -> int:
+        return max((view.height for _, view in self._fresh_views()), default=0)
+
+    async def _create_genesis(self) -> None:
+        """
+        Designated miner only, and only while no chain exists that we can see.
+        A genesis received here or a chain a peer reports is caught up on instead
+        """
+        if not self.is_miner or self.chain._get_length() > 0 or self._peer_height():
+            return
+        genesis_block = self.chain.create_genesis_block()
+        self._observe_new_block()
+        await self.broadcast_block(genesis_block)
+
+    def _network_ready(self, now: float) -> bool:
+        """
+        Every expected peer known, or a quorum of peers sent its view and the
+        miner and broadcaster it names have not changed for NETWORK_STABLE_SECONDS.
+        Falls back to the old fixed timeout for networks below the quorum
+        """
+        num_connected = len(self.peer_table)
+        if self.expected_peers and num_connected >= self.expected_peers:
+            return True
+        stable = now - self._view_stable_since >= NETWORK_STABLE_SECONDS
+        if len(self._fresh_views()) >= self.network_quorum and stable:
+            return True
+        elapsed = now - self.establishment_start_time
+        return num_connected > 1 and elapsed > self.establishment_timeout
 
     async def ensure_full_connectivity(self):
-        current_time = time.time()
-        elapsed_time = current_time - self.establishment_start_time
-        num_connected = len(self._connected_peers)
+        if self.network_established:
+            return
 
-        # Define your criteria for "full establishment" here.
-        # For example, wait for a certain number of peers or a timeout.
-        if (
-            elapsed_time > self.establishment_timeout
-            and num_connected > 1
-            and not self.network_established
-        ):
-            self.network_established = True
-            print(f"{self.my_peer.address.port}:  Network considered established.")
-
-            if self.is_miner and self.chain._get_length() == 0:
-                genesis_block = self.chain.create_genesis_block()
-                await self.broadcast_block(genesis_block)
-
-            # Start generating transactions now that the network is established
-            if self.generate_tx_task is None:
-                print(f"{self.my_peer.address.port}: Start Sending Transaction.")
-                self.generate_tx_task = self.register_task(
-                    "generate_transaction",
-                    self.generate_transaction,
-                    interval=5.0,
-                    delay=5,
-                )
-        elif not self.network_established:
-            connected_peers = set(self.network.verified_peers)
-            for peer in connected_peers:
-                peer_id = peer.public_key.key_to_bin().hex()
-                if peer not in self._connected_peers:
-                    self._connected_peers.add(peer)
-                    self._known_peers.add(peer_id)
-                    self.walk_to(peer.address)
-                    self.latest_tx_timestamps[peer_id] = 0.0
-                    # print(f"Connecting to previously discovered peer: {peer}")
-            self._determine_miner()  # Re-evaluate miner after new connections
+        for peer in self.network.verified_peers:
+            self.peer_table.add(peer)
+        self._refresh_neighbours()
+        self._update_view()  # Re-evaluate roles after new connections
+
+        current_time = clock.now()
+        if not self._network_ready(current_time):
+            return
+
+        self.network_established = True
+        self.network_ready_at = current_time
+        print(
+            f"{self.my_peer.address.port}:  Network considered established after "
+            f"{current_time - self.establishment_start_time:.2f}s "
+            f"with {len(self.peer_table)} peers."
+        )
+
+        if self.is_miner:
+            await self._create_genesis()
+
+        # Offer our CPU to whichever peer is the designated miner
+        if self.pool is not None and not self.is_miner:
+            self.broadcast(
+                PoolJoin(hash_rate=self.chain.miner.last_hash_rate),
+                self.peer_table.peers(),
+            )
+
+        # Start generating transactions now that the network is established
+        if self.load_generator is not None:
+            if not self.is_miner:
+                self.register_task("load_generator", self._run_load)
+        elif self.generate_tx_task is None:
+            print(f"{self.my_peer.address.port}: Start Sending Transaction.")
+            self.generate_tx_task = self.register_task(
+                "generate_transaction",
+                self.generate_transaction,
+                interval=5.0,
+                delay=5,
+            )
 
     # Generate Transaction (remains the same, won't be proactively sent)
     async def generate_transaction(self) -> None:
@@ -191,74 +689,168 @@ class MyCommunity(Community, PeerObserver):
             return
 
         # print("Generating transaction...")
-        bettor_id = self.crypto.key_to_bin(self.my_peer.public_key).hex()
-        bet_number = random.randint(1, 100)
-        bet_amount = random.randint(1, 100)
-        timestamp = time.time()
-
-        block = {
-            "bettor_id": bettor_id,
-            "bet_number": bet_number,
-            "bet_amount": bet_amount,
-            "timestamp": timestamp,
-        }
-
-        signature = self.crypto.create_signature(self.my_peer.key, str(block).encode())
-
-        payload = BetPayload(
-            bettor_id=bettor_id,
+        count = self.bets_per_transaction
+        payload = self._make_transaction(
+            [random.randint(1, 100) for _ in range(count)],
+            [random.randint(1, 100) for _ in range(count)],
+            clock.now(),
+        )
+        self._submit_bet(payload)
+        # print(f"Generated and stored transaction: {payload.txid}")
+
+    def _make_bet(self, bet_number: int, bet_amount: int, timestamp: float):
+        bet = BetPayload(
+            bettor_id=self.peer_table.my_key_hex,
             bet_number=bet_number,
             bet_amount=bet_amount,
             timestamp=timestamp,
-            signature=signature.hex(),
+            signature="",
         )
+        bet.signature = sign(self.my_peer.key, bet)
+        return bet
+
+    def _make_transaction(self, numbers: list, amounts: list, timestamp: float):
+        if len(numbers) == 1:
+            return self._make_bet(numbers[0], amounts[0], timestamp)
+        return self._make_batch(numbers, amounts, timestamp)
+
+    def _make_batch(self, numbers: list, amounts: list, timestamp: float):
+        """One signature over the canonical encoding covers every bet."""
+        batch = BetBatchPayload(
+            bettor_id=self.peer_table.my_key_hex,
+            bet_numbers=numbers,
+            bet_amounts=amounts,
+            timestamp=timestamp,
+            signature="",
+        )
+        batch.signature = sign(self.my_peer.key, batch)
+        return batch
 
-        txid = payload._generate_txid()
+    def _submit_bet(self, payload) -> None:
+        txid = payload.txid
         self.tx_mempool.add_transaction(txid, payload)
-        self.tx_tracker.record(self.chain._get_round_number(), txid, timestamp)
-        # print(f"Generated and stored transaction: {txid}")
+        self.tx_tracker.record(self.chain._get_round_number(), txid, payload.timestamp)
+        self._notify_pending()
+
+    async def _run_load(self) -> None:
+        generator = self.load_generator
+        print(
+            f"{self.my_peer.address.port}: Signing {generator.profile} load "
+            f"of {generator.tps} tx/s for {generator.duration}s."
+        )
+        await generator.prepare_async()
+        await generator.run()
+        report_path = f"data/{self.node_id}/load_report.json"
+        generator.dump(report_path)
+        print(f"{self.my_peer.address.port}: Load finished, report in {report_path}")
 
     async def request_transactions(self):
         # print("Requesting latest transactions from peers...")
-        for peer in self.get_peers():
-            peer_id_hex = peer.public_key.key_to_bin().hex()
-            last_seen = self.latest_tx_timestamps.get(peer_id_hex, 0.0)
-            self.ez_send(peer, TransactionsRequest(last_seen_timestamp=last_seen))
+        self._reap_transactions_requests()
+        for entry in self.peer_table.select_fetch_peers(SYNC_FANOUT):
+            self._send_transactions_request(entry)
+
+    def _send_transactions_request(self, entry: PeerEntry, hedge: bool = True) -> None:
+        self._request_counter += 1
+        request_id = self._request_counter
+        self._pending_requests[request_id] = (entry.peer.mid, clock.now())
+        entry.requests_sent += 1
+        self.ez_send(
+            entry.peer,
+            TransactionsRequest(
+                last_seen_timestamp=entry.last_seen_timestamp, request_id=request_id
+            ),
+        )
+        # Backups are timed too, so their loss counts against their peer
+        self.register_anonymous_task(
+            "hedge_transactions_request",
+            self._hedge_transactions_request,
+            request_id,
+            hedge,
+            delay=entry.hedge_timeout(),
+        )
+
+    def _hedge_transactions_request(self, request_id: int, hedge: bool) -> None:
+        """
+        Counts an unanswered request as lost and, unless it is a backup itself,
+        repeats it to the next best peer. The original stays pending, whichever
+        reply comes first is used and a late one still counts for its peer
+        """
+        pending = self._pending_requests.get(request_id)
+        if pending is None:
+            return
+        mid, _ = pending
+        entry = self.peer_table.get_by_mid(mid)
+        if entry is not None:
+            entry.record_loss()
+        if hedge:
+            for backup in self.peer_table.best(1, exclude=[mid]):
+                self._send_transactions_request(backup, hedge=False)
+
+    def _reap_transactions_requests(self) -> None:
+        """Forgets requests that went unanswered for FETCH_REQUEST_TTL."""
+        cutoff = clock.now() - FETCH_REQUEST_TTL
+        pending = self._pending_requests.items()
+        stale = [request_id for request_id, (_, sent) in pending if sent < cutoff]
+        for request_id in stale:
+            del self._pending_requests[request_id]
+
+    @staticmethod
+    def _txid_of(tx):
+        """The bet's txid, None when its fields do not even encode."""
+        try:
+            return tx.txid
+        except (ValueError, TypeError, struct.error):
+            return None
 
     @lazy_wrapper(BetPayload)
     def on_transaction_message(self, peer: Peer, payload: BetPayload):
         # This handler is now solely for processing incoming transactions
-        public_key = self.crypto.key_from_public_bin(bytes.fromhex(payload.bettor_id))
-
-        enocde_byte = str(payload).encode()
-
-        signature_bytes = bytes.fromhex(payload.signature)
-
-        if self.crypto.is_valid_signature(public_key, enocde_byte, signature_bytes):
-            txid = payload._generate_txid()
-            if not self.tx_mempool.get_transaction(txid):
-                self.tx_mempool.add_transaction(payload._generate_txid(), payload)
-                self.tx_tracker.record(
-                    self.chain._get_round_number(), txid, payload.timestamp
-                )
-                # print(
-                #     f"Received and added valid transaction {txid} from {peer.address.port}")
-                peer_id_hex = peer.public_key.key_to_bin().hex()
-                self.latest_tx_timestamps[peer_id_hex] = max(
-                    self.latest_tx_timestamps.get(peer_id_hex, 0.0), payload.timestamp
-                )
-                # Trigger mining as new transactions arrive
-                if self.is_miner and self.network_established:
-                    self._safely_register_mining_task()
-            else:
-                # Optionally update timestamp even if transaction exists
-                peer_id_hex = peer.public_key.key_to_bin().hex()
-                self.latest_tx_timestamps[peer_id_hex] = max(
-                    self.latest_tx_timestamps.get(peer_id_hex, 0.0), payload.timestamp
-                )
+        # Signed and verified over the same canonical bytes, `BetPayload._encode`
+        txid = self._txid_of(payload)
+        if txid is None:
+            return
+        # Known bets were verified when they arrived, only new ones pay for it
+        if self.tx_mempool.has_transaction(txid):
+            # Optionally update timestamp even if transaction exists
+            self.peer_table.update_watermark(peer, payload.timestamp)
+        elif payload.is_valid():
+            self.tx_mempool.add_transaction(txid, payload)
+            self.tx_tracker.record(
+                self.chain._get_round_number(), txid, payload.timestamp
+            )
+            # print(
+            #     f"Received and added valid transaction {txid} from {peer.address.port}")
+            self._record_peer_transaction(peer, payload.timestamp)
+            # New transactions can make a block due
+            self._notify_pending()
+
+    @lazy_wrapper(BetBatchPayload)
+    def on_batch_message(self, peer: Peer, payload: BetBatchPayload):
+        txid = self._txid_of(payload)
+        if txid is None:
+            return
+        if self.tx_mempool.has_transaction(txid):
+            self.peer_table.update_watermark(peer, payload.timestamp)
+            return
+        # One signature check covers every bet in the batch
+        if not payload.is_valid():
+            return
+        if self.tx_mempool.add_transaction(txid, payload):
+            self.tx_tracker.record(
+                self.chain._get_round_number(), txid, payload.timestamp
+            )
+            self._record_peer_transaction(peer, payload.timestamp)
+            self._notify_pending()
         else:
-            # print(f"Received invalid transaction from {peer.address.port}")
-            pass
+            self.peer_table.update_watermark(peer, payload.timestamp)
+
+    def _record_peer_transaction(self, peer: Peer, timestamp: float) -> None:
+        entry = self.peer_table.get(peer)
+        if entry is not None:
+            entry.tx_received += 1
+            if timestamp > entry.last_seen_timestamp:
+                entry.last_seen_timestamp = timestamp
 
     @lazy_wrapper(TransactionsRequest)
     def on_get_transactions_request(self, peer: Peer, payload: TransactionsRequest):
@@ -270,167 +862,541 @@ class MyCommunity(Community, PeerObserver):
         remaining = len(latest_txs) > MAX_TRANSACTIONS_PER_RESPONSE
         self.ez_send(
             peer,
-            TransactionsResponse(transactions=json.dumps(batch), has_more=remaining),
+            TransactionsResponse(
+                transactions=json.dumps(batch),
+                has_more=remaining,
+                request_id=payload.request_id,
+            ),
         )
 
     @lazy_wrapper(TransactionsResponse)
     def on_transactions_response(self, peer: Peer, payload: TransactionsResponse):
+        entry = self.peer_table.get(peer)
+        pending = self._pending_requests.pop(payload.request_id, None)
+        if entry is not None and pending is not None and pending[0] == peer.mid:
+            entry.record_response(clock.now() - pending[1])
+
         try:
             transactions_data = json.loads(payload.transactions)
             for tx_data in transactions_data:
-                tx = BetPayload(**tx_data)
-                txid = tx._generate_txid()
-                if not self.tx_mempool.get_transaction(txid):
-                    self.tx_mempool.add_transaction(tx._generate_txid(), tx)
+                try:
+                    if "bet_numbers" in tx_data:
+                        tx = BetBatchPayload(**tx_data)
+                    else:
+                        tx = BetPayload(**tx_data)
+                except TypeError:
+                    continue
+                txid = self._txid_of(tx)
+                if txid is None:
+                    continue
+                # Duplicates are the bulk of a pull, skip their signature check
+                if not self.tx_mempool.has_transaction(txid):
+                    if not tx.is_valid():
+                        continue
+                    self.tx_mempool.add_transaction(txid, tx)
                     self.tx_tracker.record(
                         self.chain._get_round_number(), txid, tx.timestamp
                     )
-                    peer_id_hex = peer.public_key.key_to_bin().hex()
-                    self.latest_tx_timestamps[peer_id_hex] = max(
-                        self.latest_tx_timestamps.get(peer_id_hex, 0.0), tx.timestamp
-                    )
+                    self._record_peer_transaction(peer, tx.timestamp)
+                    self._notify_pending()
 
                 else:
-                    peer_id_hex = peer.public_key.key_to_bin().hex()
-                    self.latest_tx_timestamps[peer_id_hex] = max(
-                        self.latest_tx_timestamps.get(peer_id_hex, 0.0), tx.timestamp
-                    )
+                    self.peer_table.update_watermark(peer, tx.timestamp)
 
             # Request more transactions if the response indicated there are more
+            # Continue with whichever of the responder and the best peer scores better
             if payload.has_more:
-                peer_id_hex = peer.public_key.key_to_bin().hex()
-                last_seen = self.latest_tx_timestamps.get(peer_id_hex, 0.0)
-                self.ez_send(peer, TransactionsRequest(last_seen_timestamp=last_seen))
+                candidates = self.peer_table.best(1)
+                if entry is not None:
+                    candidates.append(entry)
+                if candidates:
+                    self._send_transactions_request(
+                        min(candidates, key=PeerEntry.score)
+                    )
 
         except json.JSONDecodeError as e:
             pass
 
+    def broadcast(self, payload, peers=None) -> None:
+        """Pack and sign a payload once, then send the same bytes to every peer."""
+        if peers is None:
+            peers = self.get_peers()
+        if not peers:
+            return
+        packet = self.ezr_pack(payload.msg_id, payload)
+        # The OS refuses these (EMSGSIZE) and the endpoint drops that silently
+        if len(packet) > MAX_DATAGRAM_BYTES:
+            print(
+                f"{self.my_peer.address.port}: {type(payload).__name__} of "
+                f"{len(packet)} bytes does not fit in a datagram, not sent."
+            )
+            return
+        for peer in peers:
+            self.endpoint.send(peer.address, packet)
+
+    def _relay(self, source: Peer, payload) -> None:
+        """Forwards a gossiped message to our neighbours until its hop limit."""
+        if payload.hops >= GOSSIP_MAX_HOPS:
+            return
+        self.broadcast(
+            replace(payload, hops=payload.hops + 1), self._gossip_targets(source)
+        )
+
     async def broadcast_block(self, block: Block):
-        for peer in self.get_peers():
-            self.ez_send(peer, block)
+        self._seen_messages.add(block.hash)
+        self.broadcast(block, self._gossip_targets())
         print(f"{self.my_peer.address.port}: Block {block.index} broadcasted.")
 
     @lazy_wrapper(Block)
     async def on_block(self, peer: Peer, payload: Block):
+        if payload.hash in self._seen_messages:
+            return
         print(
             f"{self.my_peer.address.port}: Received block {payload.index} from {peer.address.port}"
         )
         if self.chain.validate_block(payload):
-            if self.chain._add_block(payload):
-                print(
-                    f"{self.my_peer.address.port}: Added block {payload.index} to the chain."
-                )
-                self.tx_mempool.remove_transactions(payload.transactions)
-
-                # If the Chain Length is 12, Trigger Broadcast Lottery
-                if (self.chain._get_length() % BLOCKS_PER_ROUND == 0) and (
-                    self.chain._get_length() > 0
-                ):
-
-                    self.broadcast_lottery()
-
-            else:
-                print(
-                    f"{self.my_peer.address.port}: Block {payload.index} already in chain."
-                )
+            # Only marked once valid, a forged body under a real block's hash
+            # must not get the genuine block dropped as a duplicate
+            self._seen_messages.add(payload.hash)
+            entry = self.peer_table.get(peer)
+            if entry is not None:
+                entry.blocks_received += 1
+            self._add_incoming_neighbour(peer)
+            self._relay(peer, payload)
+            if self._missing_parent(payload):
+                # Ahead of us, the blocks from our height up. Otherwise it is on
+                # a branch we lack further down, the blocks right below it
+                length = self.chain._get_length()
+                if payload.index > length:
+                    self._request_blocks(peer, length)
+                else:
+                    self._request_blocks(peer, max(0, payload.index - CATCHUP_BATCH))
+            self._connect_block(payload)
         else:
             print(
                 f"{self.my_peer.address.port}: Invalid block {payload.index} received."
             )
 
-    # Lottery
-
-    def broadcast_lottery(self):
-        round_number = self.chain._get_round_number()
-        self.tx_tracker.flush(round_number)
-        self.tx_tracker.dump()
-        if self.is_lottery_broadcaster:
+    def _missing_parent(self, block: Block) -> bool:
+        """
+        Neither the parent nor a block waiting as the parent is known. Only
+        the lowest block of a missing stretch asks for it, not every block
+        """
+        parent = block.previous_hash
+        tree = self.chain.tree
+        return parent != "0" and parent not in tree and not tree.is_waiting(parent)
+
+    def _connect_block(self, block: Block) -> None:
+        """Fork choice, then settle the rounds now deep enough."""
+        removed, added = self.chain.connect_block(block)
+        if not added:
+            return
+        self._observe_new_block(added)
+        if removed:
             print(
-                f"!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!! CHAIN LENGTH IS NOW {self.chain._get_length()}, BROADCASTING LOTTERY !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!"
+                f"{self.my_peer.address.port}: Reorg at height {added[0].index}, "
+                f"{len(removed)} blocks replaced by {len(added)}."
             )
-
-            lottery_result, total_amount, winner_list = self.chain.get_winning_result()
-
+            self._notify_pending()  # Orphaned bets are back in the mempool
+        else:
             print(
-                f"Received lottery result for round {round_number}. Winning number is {lottery_result}. Total Amount is {total_amount}"
+                f"{self.my_peer.address.port}: Added block {added[-1].index} to the chain."
             )
-
-            print("Winner:", json.dumps(winner_list, indent=4))
-            if lottery_result is not None:
-                for peer in self.get_peers():
-                    self.ez_send(
-                        peer,
-                        LotteryResult(
-                            round=self.chain._get_round_number(),
-                            winning_number=lottery_result,
-                            total_amount=total_amount,
-                            winner_list=json.dumps(winner_list),
-                        ),
-                    )
-
-    async def select_lottery_broadcaster(self):
-        all_peers = list(self.get_peers()) + [self.my_peer]
-        if all_peers:
-            sorted_peers = sorted(
-                all_peers, key=lambda p: p.public_key.key_to_bin().hex()
-            )
-            broadcaster = sorted_peers[0]
-            if broadcaster == self.my_peer:
-                self.is_lottery_broadcaster = True
+        self._settle_confirmed_rounds()
+
+    def _settle_confirmed_rounds(self) -> None:
+        """
+        Settles each round once `settlement_confirmations` blocks are on top of
+        it, and again if a reorg has since replaced its last block
+        """
+        length = self.chain._get_length()
+        confirmed = (length - self.settlement_confirmations) // BLOCKS_PER_ROUND
+        for round_number in range(1, confirmed + 1):
+            last_block = self.chain.chain[round_number * BLOCKS_PER_ROUND - 1]
+            settled = self._settled_rounds.get(round_number)
+            if settled == last_block.hash:
+                continue
+            if settled is not None:
                 print(
-                    f"{broadcaster.address.port} is the lottery broadcaster (lowest peer ID)."
+                    f"{self.my_peer.address.port}: Round {round_number} was "
+                    f"reorganised after settlement, settling it again."
                 )
+            self._settled_rounds[round_number] = last_block.hash
+            self._close_round(round_number)
+
+    # Chain Catch-up
+
+    def catch_up(self) -> None:
+        """Asks the peer reporting the longest chain for the blocks we lack."""
+        cutoff = clock.now() - FETCH_REQUEST_TTL
+        for key, sent in list(self._block_requests.items()):
+            if sent < cutoff:
+                del self._block_requests[key]
+        length = self.chain._get_length()
+        views = self._fresh_views()
+        if not views:
+            return
+        mid, view = max(views, key=lambda item: item[1].height)
+        if view.height > length:
+            self._request_blocks(self.peer_table.get_by_mid(mid).peer, length)
+
+    def _request_blocks(self, peer: Peer, start: int) -> None:
+        # The same stretch is asked of a peer once per FETCH_REQUEST_TTL
+        key = (peer.mid, start)
+        if key in self._block_requests:
+            return
+        self._block_requests[key] = clock.now()
+        self.ez_send(peer, BlocksRequest(start=start))
+
+    @lazy_wrapper(BlocksRequest)
+    def on_blocks_request(self, peer: Peer, payload: BlocksRequest):
+        # Sent at the hop limit, so catch-up blocks go to the asker only
+        start = max(0, payload.start)
+        blocks = self.chain.chain[start : start + CATCHUP_BATCH]
+        for block in blocks:
+            self.broadcast(replace(block, hops=GOSSIP_MAX_HOPS), [peer])
+
+    # Lottery
+
+    def _close_round(self, round_number: int) -> None:
+        """Hands a snapshot of the round to the settlement stage and returns."""
+        self.settlement.submit(
+            round_number, self.chain._get_blocks_for_round(round_number)
+        )
+
+    async def broadcast_lottery(self, round_number: int, round_blocks: list):
+        """Settlement stage: log coverage, compute and store winners, publish."""
+        last_block = round_blocks[-1].hash if round_blocks else ""
+        replaced = self._lottery_results.get(round_number)
+        if replaced == last_block:
+            return
+        if replaced is None:
+            self.tx_tracker.flush(round_number)
+        self._lottery_results[round_number] = last_block
+        if not self.is_lottery_broadcaster:
+            return
+        # The blocks are a snapshot taken on the loop, so winners are counted
+        # and serialized on an executor thread and a block arriving meanwhile
+        # is not held up
+        loop = asyncio.get_running_loop()
+        lottery_result, total_amount, winners, record = await loop.run_in_executor(
+            None, compute_result, round_number, round_blocks, replaced
+        )
+        logger.info(
+            "%s: Round %d closed over %d blocks, winning number %s, total amount "
+            "%d, winners %s",
+            self.my_peer.address.port,
+            round_number,
+            len(round_blocks),
+            lottery_result,
+            total_amount,
+            winners,
+        )
+        if self.telemetry is not None:
+            self.telemetry.emit("result", round_number, lottery_result, total_amount)
         else:
-            print("No peers available to select a lottery broadcaster.")
-            self.is_lottery_broadcaster = False
+            # Appended on the log writer thread, like the coverage log
+            self.tx_tracker.writer.append(self.results_path, record)
+        if lottery_result is not None:
+            self._seen_messages.add(f"result_{round_number}_{last_block}")
+            self.broadcast(
+                LotteryResult(
+                    round=round_number,
+                    winning_number=lottery_result,
+                    total_amount=total_amount,
+                    winner_list=winners,
+                    last_block=last_block,
+                ),
+                self._gossip_targets(),
+            )
 
     @lazy_wrapper(LotteryResult)
     def on_lottery_result(self, peer: Peer, payload: LotteryResult):
-
+        # Keyed on the round's last block too, a reorged round's new result
+        # must get through after the old one
+        key = f"result_{payload.round}_{payload.last_block}"
+        if key in self._seen_messages:
+            return
         try:
             winner_list = json.loads(payload.winner_list)
-            my_public_key_hex = self.crypto.key_to_bin(self.my_peer.public_key).hex()
-            if my_public_key_hex in winner_list:
-                winnings = winner_list[my_public_key_hex]
-                print(
-                    f"Congratulations! This node ({self.my_peer.address.port}) won {winnings} in the lottery (Round {payload.round})."
-                )
+        except json.JSONDecodeError:
+            return
+        if not isinstance(winner_list, dict):
+            return
+        # Marked and relayed only once it parses, see on_block
+        self._seen_messages.add(key)
+        self._relay(peer, payload)
 
-        except (json.JSONDecodeError, AttributeError, KeyError) as e:
-            pass
+        replaced = self._received_results.get(payload.round)
+        self._received_results[payload.round] = payload.last_block
+        if replaced is not None and replaced != payload.last_block:
+            print(
+                f"{self.my_peer.address.port}: Round {payload.round} result "
+                f"replaced after a reorg, winning number is {payload.winning_number}."
+            )
+        my_public_key_hex = self.peer_table.my_key_hex
+        if my_public_key_hex in winner_list:
+            winnings = winner_list[my_public_key_hex]
+            print(
+                f"Congratulations! This node ({self.my_peer.address.port}) won {winnings} in the lottery (Round {payload.round})."
+            )
 
     async def _mine_and_broadcast(self):
-
+        """Mines whenever the block scheduler says a block is due."""
         while True:
-            await asyncio.sleep(5)  # Check every 5 seconds (adjust as needed)
-            if (
-                self.is_miner
-                and self.network_established
-                and self.tx_mempool.get_all_transactions()
-            ):
-                print(f"{self.my_peer.address.port}: Mining a new block...")
-                transactions_to_mine = self.tx_mempool.get_all_transactions()
-                if transactions_to_mine:
-                    new_block = self.chain.create_block()
-                    if new_block:
-
-                        await self.broadcast_block(new_block)
-
-                        self.tx_mempool.clear_mempool()  # Clear mempool after successful mining
-                        print(
-                            f"{self.my_peer.address.port}: Successfully mined and broadcasted block {new_block.index}."
-                        )
-                    else:
-                        print(
-                            f"{self.my_peer.address.port}: Failed to create a new block."
-                        )
-                else:
-                    print(
-                        f"{self.my_peer.address.port}: No transactions in mempool to mine."
-                    )
+            if not self._mining_enabled():
+                await asyncio.sleep(NETWORK_CHECK_INTERVAL)
+                continue
+            reason = await self.block_scheduler.wait()
+            if not self._mining_enabled():
+                continue
+            print(f"{self.my_peer.address.port}: Mining a new block ({reason})...")
+            if self.competitive_mining:
+                await self._mine_on_tip()
+            elif self.pool is not None:
+                await self._mine_pooled()
+            else:
+                await self._mine_block()
+
+    def _mining_enabled(self) -> bool:
+        return (
+            self.network_established
+            and self.chain._get_length() > 0
+            and (self.is_miner or self.competitive_mining)
+        )
+
+    def _notify_pending(self) -> None:
+        """A transaction entered the mempool, it may make a block due."""
+        if self._mining_enabled():
+            self.block_scheduler.notify()
+
+    def _take_template(self) -> Block:
+        """
+        The block prepared after the last one, unless the tip moved. Bets that
+        arrived since are topped up into it rather than starting over
+        """
+        template, self._template = self._template, None
+        if (
+            template is None
+            or template.previous_hash != self.chain._get_latest_block().hash
+        ):
+            return self.chain.prepare_block()
+        if self._template_version != self.tx_mempool.version:
+            self.chain.top_up_block(template)
+        template.timestamp = clock.now()
+        return template
+
+    def _prepare_next_template(self) -> None:
+        # Selecting and digesting the next bets is done once the block is out,
+        # so the next trigger only has the nonce search left
+        self._template = self.chain.prepare_block()
+        self._template.body_digest  # Cached on the block
+        self._template_version = self.tx_mempool.version
+
+    async def _mine_block(self):
+        new_block = self.chain.create_block(self._take_template())
+        self._observe_new_block()
+        await self.broadcast_block(new_block)
+        self._prepare_next_template()
+
+        # create_block took the mined transactions out of the mempool
+        print(
+            f"{self.my_peer.address.port}: Successfully mined and broadcasted block {new_block.index}."
+        )
+
+    async def _mine_on_tip(self):
+        """Competitive mining: one block on the current tip, dropped if it moves."""
+        # At this difficulty every node would solve a due block at the same
+        # moment and each height would be a race. An exponential head start
+        # stands in for PoW luck, whoever draws the shortest usually wins alone
+        tip = self.chain._get_latest_block().hash
+        await asyncio.sleep(random.expovariate(1 / COMPETITIVE_MINING_SPREAD))
+        if self.chain._get_latest_block().hash != tip:
+            return
+        template = self._take_template()
+        tip = template.previous_hash
+        print(f"{self.my_peer.address.port}: Mining block {template.index} on {tip[:8]}")
+        new_block = await self.chain.miner.mine_block_async(
+            template, lambda: self.chain._get_latest_block().hash != tip
+        )
+        if new_block is None:
+            print(
+                f"{self.my_peer.address.port}: Abandoned block {template.index}, "
+                f"a heavier tip arrived."
+            )
+            return
+        self._connect_block(new_block)
+        await self.broadcast_block(new_block)
+        self._prepare_next_template()
+
+    # Pool Mining
+
+    async def _mine_pooled(self):
+        """Designated miner: searches ranges itself while the workers search theirs."""
+        new_block = self._take_template()
+        self.tx_mempool.remove_transactions(new_block.transactions)
+        self.tx_mempool.remove_transactions(new_block.batches)
+        header = new_block._header_prefix()
+        job_id = self.pool.open(header, new_block.difficulty)
+        print(
+            f"{self.my_peer.address.port}: Pool job {job_id} for block "
+            f"{new_block.index}, {len(self.pool.workers)} workers."
+        )
+        start_time = time.time()
+        hashes = 0
+        my_key = self.peer_table.my_key_hex
+        while self.pool.solution is None:
+            self.pool.expire()
+            for key_hex in self.pool.idle_workers():
+                self._send_range(key_hex)
+            nonce_range = self.pool.assign(my_key)
+            found, tried = await self.chain.miner.search_async(
+                header,
+                new_block.difficulty,
+                *nonce_range,
+                lambda: self.pool.solution is not None,
+            )
+            hashes += tried
+            self.pool.complete(job_id, my_key, nonce_range, tried)
+            if found is not None and self.pool.solution is None:
+                self.pool.solution = found
+        self.pool.close()
+        # Workers would otherwise search out their ranges for nothing
+        busy = [w.key_hex for w in self.pool.workers.values() if w.busy is not None]
+        self._send_to_workers(JobClosed(job_id=job_id), busy)
+
+        self.chain.miner.seal_found(
+            new_block, self.pool.solution, hashes, time.time() - start_time
+        )
+        self.chain.commit_block(new_block)
+        self._observe_new_block()
+        await self.broadcast_block(new_block)
+        self._prepare_next_template()
+
+    def _send_range(self, key_hex: str) -> None:
+        entry = self.peer_table.get_by_hex(key_hex)
+        if entry is None:
+            self.pool.leave(key_hex)
+            return
+        nonce_range = self.pool.assign(key_hex)
+        if nonce_range is None:
+            return
+        start, stop = nonce_range
+        self.ez_send(
+            entry.peer,
+            MiningJob(
+                job_id=self.pool.job_id,
+                header=self.pool.header,
+                difficulty=self.pool.difficulty,
+                start=start,
+                stop=stop,
+            ),
+        )
+
+    def _send_to_workers(self, payload, keys) -> None:
+        entries = (self.peer_table.get_by_hex(key_hex) for key_hex in keys)
+        self.broadcast(payload, [entry.peer for entry in entries if entry is not None])
+
+    @lazy_wrapper(JobClosed)
+    def on_job_closed(self, peer: Peer, payload: JobClosed):
+        entry = self.peer_table.get(peer)
+        if entry is None or entry.key_hex != self.miner_key:
+            return
+        if self._pool_job == payload.job_id:
+            self._pool_job = None  # search_async sees it at its next chunk
+
+    @lazy_wrapper(PoolJoin)
+    def on_pool_join(self, peer: Peer, payload: PoolJoin):
+        entry = self.peer_table.get(peer)
+        if self.pool is None or entry is None:
+            return
+        worker = self.pool.join(entry.key_hex, payload.hash_rate)
+        if self.is_miner and worker.busy is None:
+            self._send_range(entry.key_hex)
+
+    @lazy_wrapper(MiningJob)
+    async def on_mining_job(self, peer: Peer, payload: MiningJob):
+        entry = self.peer_table.get(peer)
+        if self.pool is None or self.is_miner or entry is None:
+            return
+        # Only the designated miner hands out work
+        if entry.key_hex != self.miner_key:
+            return
+        self._pool_job = payload.job_id
+        found, hashes = await self.chain.miner.search_async(
+            payload.header,
+            payload.difficulty,
+            payload.start,
+            payload.stop,
+            lambda: self._pool_job != payload.job_id,
+        )
+        if found is None and self._pool_job != payload.job_id:
+            return  # A newer block replaced this job
+        self.ez_send(
+            peer,
+            MiningResult(
+                job_id=payload.job_id,
+                start=payload.start,
+                stop=payload.stop,
+                nonce=-1 if found is None else found,
+                hashes=hashes,
+            ),
+        )
+
+    @lazy_wrapper(MiningResult)
+    def on_mining_result(self, peer: Peer, payload: MiningResult):
+        entry = self.peer_table.get(peer)
+        if self.pool is None or entry is None:
+            return
+        nonce_range = (payload.start, payload.stop)
+        completed = self.pool.complete(
+            payload.job_id, entry.key_hex, nonce_range, payload.hashes
+        )
+        if not completed or not self.pool.active:
+            return
+        # A worker's nonce is only taken once it hashes below the target here
+        if payload.start <= payload.nonce < payload.stop and search(
+            self.pool.header, self.pool.difficulty, payload.nonce, payload.nonce + 1
+        ) is not None:
+            self.pool.solution = payload.nonce
+            print(
+                f"{self.my_peer.address.port}: Pool worker {peer.address.port} "
+                f"solved job {payload.job_id}."
+            )
+            return
+        self._send_range(entry.key_hex)
+
+    def on_packet(self, packet, warn_unknown: bool = True) -> None:
+        if self.trace_writer is not None:
+            self.trace_writer.record(*packet)
+        super().on_packet(packet, warn_unknown)
+
+    async def unload(self) -> None:
+        if self.trace_writer is not None:
+            self.trace_writer.close()
+        if self._metrics_runner is not None:
+            await self._metrics_runner.cleanup()
+        if self.watchdog is not None:
+            self.watchdog.stop()
+        self.memory_snapshots.stop()
+        self.peer_discovery_tracker.close()
+        # Log writes are queued on a thread, wait for them before exiting
+        self.tx_tracker.writer.flush(timeout=5.0)
+        if self.telemetry is not None:
+            await self.telemetry.close()
+        await super().unload()
 
     def started(self) -> None:
         self.network.add_peer_observer(self)
 
+        if self.watchdog is not None:
+            self.watchdog.start()
+        try:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGUSR1, self._profile_to_file
+            )
+        except (NotImplementedError, AttributeError, RuntimeError):
+            pass  # No SIGUSR1 (Windows) or not on the main thread
+
         # Do not register generate_transaction here initially
         pass
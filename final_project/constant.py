@@ -3,3 +3,65 @@
 BLOCKS_PER_ROUND = 12
 DEFAULT_DIFFICULTY = 1
 TARGET_BLOCK_TIME = 20  # seconds
+MAX_BLOCK_TRANSACTIONS = 100  # bets and batches per block, a batch counts as one
+MAX_BLOCK_BYTES = 63000  # packed bets per block, the rest of a datagram is headers
+MAX_DATAGRAM_BYTES = 65507  # largest UDP payload, bigger packets are never sent
+MAX_BATCH_BETS = 16  # bets in one batch transaction, larger batches are malformed
+
+# Gossip overlay
+GOSSIP_DEGREE = 6  # neighbours each node keeps and relays to
+GOSSIP_MAX_HOPS = 8  # relay limit for blocks and results
+GOSSIP_SEEN_CACHE_SIZE = 4096  # message keys remembered for duplicate suppression
+GOSSIP_RESAMPLE_INTERVAL = 10.0  # seconds between swapping a neighbour for another peer
+CATCHUP_INTERVAL = 2.0  # seconds between checks for a peer with a longer chain
+CATCHUP_BATCH = 16  # blocks sent back for one catch-up request
+
+# Transaction sync peer selection
+SYNC_FANOUT = 2  # best-scored peers pulled from each sync tick
+DEFAULT_PEER_RTT = 0.5  # seconds, assumed for peers not measured yet
+FETCH_HEDGE_TIMEOUT = 1.0  # seconds, floor before a request is hedged
+FETCH_REQUEST_TTL = 10.0  # seconds an unanswered request waits for a late reply
+RTT_ALPHA = 0.125  # EWMA weight for new RTT samples
+LOSS_ALPHA = 0.2  # EWMA weight for new loss samples
+
+# Event loop watchdog and profiler
+LOOP_LAG_THRESHOLD = 0.1  # seconds blocked before a stack is captured
+LOOP_WATCHDOG_INTERVAL = 0.05  # seconds between heartbeats
+PROFILE_SECONDS = 10.0  # default length of an on-demand profile
+MEMORY_WALK_LIMIT = 1_000_000  # objects /debug/memory walks per component
+
+# Network establishment
+NETWORK_CHECK_INTERVAL = 0.25  # seconds between readiness checks
+NETWORK_STABLE_SECONDS = 3.0  # role view must be unchanged this long to be ready
+NETWORK_QUORUM = 2  # peers needed before the network can be ready
+NETWORK_READY_TIMEOUT = 10.0  # seconds, fallback when the quorum is never met
+PEER_VIEW_INTERVAL = 1.0  # seconds between role view exchanges with every peer
+PEER_VIEW_TTL = 3.0  # seconds a peer's view counts after it was received
+
+# Load generation
+LOAD_DURATION = 60.0  # seconds of load per run
+LOAD_BURST_PERIOD = 1.0  # seconds between bursts in the bursty profile
+
+# Logs
+DISCOVERY_COMPACT_EVERY = 500  # appended edges between discovery log compactions
+TRACE_FLUSH_INTERVAL = 1.0  # seconds of inbound trace a killed node can lose
+
+# Telemetry collector
+TELEMETRY_QUEUE_SIZE = 10000  # events a node buffers before dropping the oldest
+TELEMETRY_FLUSH_INTERVAL = 0.2  # seconds between batches sent to the collector
+TELEMETRY_MAX_BUFFER = 1024 * 1024  # unsent socket bytes before a batch is held
+TELEMETRY_REORDER_WINDOW = 2.0  # seconds the collector waits for late events
+
+# Mining
+MINING_MODES = ("single", "competitive", "pool")  # see MyCommunity.mining_mode
+MINING_CHUNK = 10000  # nonces tried between event loop yields and staleness checks
+SETTLEMENT_CONFIRMATIONS = 3  # blocks on top of a round before it is settled
+ORPHAN_BLOCK_LIMIT = 64  # blocks kept while their parent has not arrived
+COMPETITIVE_MINING_SPREAD = 5.0  # seconds, mean random wait before mining a race
+POOL_RANGE_SIZE = 50000  # nonces handed to a pool worker at a time
+POOL_RANGE_TIMEOUT = 5.0  # seconds before an unreported range is reassigned
+
+# Block scheduling, a block is cut on whichever of these comes first
+BLOCK_MAX_WAIT = 5.0  # seconds the oldest pending bet may wait
+ROUND_TARGET_SECONDS = BLOCKS_PER_ROUND * TARGET_BLOCK_TIME  # round deadline
+BLOCK_MIN_INTERVAL = 1.0  # seconds, floor between deadline-driven blocks
@@ -4,19 +4,10 @@ from messages.betpayload import BetPayload
 
 
 class Database:
-    _instance = None
-    _initialized = False
-
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(Database, cls).__new__(cls)
-        return cls._instance
-
-    def __init__(self):
-        if not Database._initialized:
-            self.blockchain_db = {}
-            self.mempool = Mempool()  # Get the singleton Mempool instance
-            Database._initialized = True
+    def __init__(self, mempool: Optional[Mempool] = None):
+        self.blockchain_db = {}
+        # Shares the owning node's mempool
+        self.mempool = mempool if mempool is not None else Mempool()
 
     def save_block(self, block: Dict) -> None:
         block_key = f"block_{block['index']}"
@@ -44,7 +35,5 @@ class Database:
         return blocks
 
     def save_transaction(self, transaction: Dict) -> None:
-        tx_id = transaction.get(
-            "id", str(transaction["timestamp"]) + transaction["sender"])
         bet_payload = BetPayload(**transaction)
-        self.mempool.add_transaction(tx_id, bet_payload)
+        self.mempool.add_transaction(bet_payload.txid, bet_payload)
@@ -1,60 +1,75 @@
-from dataclasses import asdict
-from typing import Dict, List, Optional
+from itertools import islice
+from typing import Dict, List, Optional, Union
 
+from messages.betbatch import BetBatchPayload
 from messages.betpayload import BetPayload
+from utils import clock
 
 
-class Mempool:
-    _instance: Optional["Mempool"] = None
+# Anything with a txid and a timestamp: single bets and bet batches
+Transaction = Union[BetPayload, BetBatchPayload]
 
-    def __new__(cls) -> "Mempool":
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._mempool = {}
-        return cls._instance
 
-    @classmethod
-    def get_instance(cls) -> "Mempool":
-        if not cls._instance:
-            cls._instance = cls()
-        return cls._instance
+class Mempool:
+    def __init__(self) -> None:
+        self._mempool: Dict[str, Transaction] = {}
+        # txid -> local arrival time, for how long the oldest bet has waited
+        self._arrived: Dict[str, float] = {}
+        # Bumped on every change, tells a prepared block template it is stale
+        self.version = 0
 
-    def add_transaction(self, txid: str, payload: BetPayload) -> bool:
+    def add_transaction(self, txid: str, payload: Transaction) -> bool:
         if txid in self._mempool:
             # print(f"Transaction with TXID {txid} already in mempool.")
             return False
-        self._mempool[txid] = asdict(payload)
+        # Payloads are kept as-is so their cached txid travels with them
+        self._mempool[txid] = payload
+        self._arrived[txid] = clock.now()
+        self.version += 1
         # print(f"Transaction {txid} added to mempool.")
         return True
 
-    def get_transaction(self, txid: str) -> Optional[BetPayload]:
-        tx_data = self._mempool.get(txid)
-        if tx_data:
-            return BetPayload(**tx_data)
-        return None
+    def has_transaction(self, txid: str) -> bool:
+        return txid in self._mempool
+
+    def get_transaction(self, txid: str) -> Optional[Transaction]:
+        return self._mempool.get(txid)
 
     def remove_single_transaction(self, txid: str) -> bool:
         if txid in self._mempool:
             del self._mempool[txid]
+            del self._arrived[txid]
+            self.version += 1
             # print(f"Transaction {txid} removed from mempool.")
             return True
         # print(f"Transaction {txid} not found in mempool.")
         return False
 
-    def remove_transactions(self, transactions: BetPayload):
-        txn_list = [tx._generate_txid() for tx in transactions]
-        for txn in txn_list:
-            self.remove_single_transaction(txn)
+    def remove_transactions(self, transactions: List[Transaction]):
+        for tx in transactions:
+            self.remove_single_transaction(tx.txid)
+
+    def oldest_arrival(self) -> Optional[float]:
+        """When the oldest pending transaction arrived here, None when empty."""
+        for txid in self._mempool:
+            return self._arrived[txid]
+        return None
+
+    def get_all_transactions(self) -> List[Transaction]:
+        return list(self._mempool.values())
 
-    def get_all_transactions(self) -> List[BetPayload]:
-        return [BetPayload(**data) for data in self._mempool.values()]
+    def get_transactions(self, limit: int) -> List[Transaction]:
+        """Oldest `limit` transactions, in arrival order."""
+        return list(islice(self._mempool.values(), limit))
 
-    def get_latest_transactions(self, last_seen_timestamp: float) -> list[BetPayload]:
+    def get_latest_transactions(self, last_seen_timestamp: float) -> list[Transaction]:
         latest_txs = []
-        for tx in self.get_all_transactions():
+        for tx in self._mempool.values():
             if tx.timestamp > last_seen_timestamp:
                 latest_txs.append(tx)
         return latest_txs
 
     def clear_mempool(self):
         self._mempool = {}
+        self._arrived = {}
+        self.version += 1
@@ -1,8 +1,101 @@
 from asyncio import run
 
-from network.setup import start_network
+from constant import DEFAULT_DIFFICULTY, LOAD_DURATION, MAX_BATCH_BETS, MINING_MODES
+from network.setup import BOOTSTRAP_MODES, parse_peers, start_network
+from messages.signing import KEY_TYPES
+from utils.load_generator import PROFILES, parse_bets_per_tx
 
-import sys
+import argparse
+import logging
 
 
-run(start_network(sys.argv[1]))
+parser = argparse.ArgumentParser()
+parser.add_argument("key", type=int, help="node number, picks the key file and data dir")
+parser.add_argument(
+    "--trace",
+    action="store_true",
+    help="record inbound messages to data/node_<key>/inbound.trace",
+)
+parser.add_argument(
+    "--metrics-port",
+    type=int,
+    help="serve Prometheus metrics on http://127.0.0.1:<port>/metrics",
+)
+parser.add_argument(
+    "--bootstrap",
+    choices=BOOTSTRAP_MODES,
+    default="public",
+    help="public trackers, a static peer list, or LAN UDP broadcast",
+)
+parser.add_argument(
+    "--peers",
+    type=parse_peers,
+    default="127.0.0.1:8090-8099",
+    help="static bootstrap addresses, e.g. 127.0.0.1:8090-8099,10.0.0.2:8090",
+)
+parser.add_argument(
+    "--load-tps",
+    type=float,
+    help="stress mode: submit this many pre-signed bets per second",
+)
+parser.add_argument("--load-profile", choices=PROFILES, default="steady")
+parser.add_argument("--load-duration", type=float, default=LOAD_DURATION)
+parser.add_argument(
+    "--bets-per-tx",
+    type=parse_bets_per_tx,
+    default=1,
+    help=f"bets per transaction, above 1 sends signed batches (max {MAX_BATCH_BETS})",
+)
+parser.add_argument(
+    "--key-type",
+    choices=KEY_TYPES,
+    default="medium",
+    help="curve25519 signs with Ed25519, much faster than the EC curves",
+)
+parser.add_argument(
+    "--telemetry",
+    metavar="SOCKET",
+    help="stream events to collector.py on this Unix socket instead of data/ files",
+)
+parser.add_argument(
+    "--mining",
+    choices=MINING_MODES,
+    default="single",
+    help="competitive: every node mines, the heaviest chain wins; "
+    "pool: the miner hands nonce ranges to the other pool nodes",
+)
+parser.add_argument(
+    "--difficulty",
+    type=int,
+    default=DEFAULT_DIFFICULTY,
+    help="leading hex zeros a block hash needs, every node must use the same value",
+)
+args = parser.parse_args()
+
+# Node events at INFO, IPv8's own logging stays at warnings
+logging.basicConfig(format="%(asctime)s %(message)s")
+logging.getLogger("community").setLevel(logging.INFO)
+
+load = None
+if args.load_tps:
+    load = {
+        "load_tps": args.load_tps,
+        "load_profile": args.load_profile,
+        "load_duration": args.load_duration,
+    }
+
+run(
+    start_network(
+        args.key,
+        trace=args.trace,
+        metrics_port=args.metrics_port,
+        bootstrap=args.bootstrap,
+        peers=args.peers,
+        load=load,
+        bets_per_transaction=args.bets_per_tx,
+        key_type=args.key_type,
+        telemetry_socket=args.telemetry,
+        mining_mode=args.mining,
+        difficulty=args.difficulty,
+    )
+)
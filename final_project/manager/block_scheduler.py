@@ -0,0 +1,115 @@
+import asyncio
+from typing import Callable, Optional
+
+from constant import (
+    BLOCK_MAX_WAIT,
+    BLOCK_MIN_INTERVAL,
+    BLOCKS_PER_ROUND,
+    MAX_BLOCK_TRANSACTIONS,
+    ROUND_TARGET_SECONDS,
+)
+from utils import clock
+
+
+class BlockScheduler:
+    """
+    Decides when the next block is cut, whichever comes first:
+    `size` transactions pending, `max_wait` seconds since the oldest pending
+    one arrived, or the round falling behind its deadline. The last one fires
+    with an empty mempool too, so a quiet round still closes on time. Only
+    a full block may follow the previous one sooner than `min_interval`
+    `notify()` when a transaction is pending, `block_added()` for every block
+    """
+
+    def __init__(
+        self,
+        pending: Callable[[], int],
+        oldest_pending: Callable[[], Optional[float]],
+        size: int = MAX_BLOCK_TRANSACTIONS,
+        max_wait: float = BLOCK_MAX_WAIT,
+        round_seconds: float = ROUND_TARGET_SECONDS,
+        min_interval: float = BLOCK_MIN_INTERVAL,
+    ) -> None:
+        self.pending = pending
+        self.oldest_pending = oldest_pending
+        self.size = size
+        self.max_wait = max_wait
+        self.round_seconds = round_seconds
+        self.min_interval = min_interval
+        self.first_pending_at: Optional[float] = None
+        self.last_block_at: Optional[float] = None
+        self.round_started_at: Optional[float] = None
+        self.blocks_in_round = 0
+        self._wake = asyncio.Event()
+
+    def notify(self) -> None:
+        if self.first_pending_at is None:
+            self.first_pending_at = clock.now()
+            self._wake.set()  # A max_wait timer to start
+        elif self.pending() >= self.size:
+            self._wake.set()
+
+    def block_added(self, chain_length: int) -> None:
+        now = clock.now()
+        self.last_block_at = now
+        self.blocks_in_round = (chain_length - 1) % BLOCKS_PER_ROUND + 1
+        if self.blocks_in_round == 1:
+            self.round_started_at = now
+        # Bets the block left behind keep their arrival time, they are not
+        # allowed to wait max_wait again from here
+        self.first_pending_at = self.oldest_pending()
+        self._wake.set()
+
+    def round_due_at(self) -> Optional[float]:
+        """Spreads the time left in the round evenly over its remaining blocks."""
+        if self.last_block_at is None:
+            return None
+        left = BLOCKS_PER_ROUND - self.blocks_in_round
+        if left == 0:  # The next block opens a new round
+            pace = self.round_seconds / BLOCKS_PER_ROUND
+        else:
+            deadline = self.round_started_at + self.round_seconds
+            pace = (deadline - self.last_block_at) / left
+        return self.last_block_at + max(pace, self.min_interval)
+
+    def max_wait_at(self) -> Optional[float]:
+        if self.first_pending_at is None:
+            return None
+        due_at = self.first_pending_at + self.max_wait
+        if self.last_block_at is not None:
+            # Leftovers keep their arrival time, this keeps them from cutting
+            # one small block right after another
+            due_at = max(due_at, self.last_block_at + self.min_interval)
+        return due_at
+
+    def due(self, now: float) -> Optional[str]:
+        """Why a block is due now, or None."""
+        if self.pending() >= self.size:
+            return "size"
+        max_wait_due = self.max_wait_at()
+        if max_wait_due is not None and now >= max_wait_due:
+            return "max_wait"
+        round_due = self.round_due_at()
+        if round_due is not None and now >= round_due:
+            return "round_deadline"
+        return None
+
+    def _next_deadline(self) -> Optional[float]:
+        times = [self.round_due_at(), self.max_wait_at()]
+        times = [t for t in times if t is not None]
+        return min(times) if times else None
+
+    async def wait(self) -> str:
+        """Sleeps until a block is due, returns the trigger."""
+        while True:
+            now = clock.now()
+            reason = self.due(now)
+            if reason is not None:
+                return reason
+            self._wake.clear()
+            deadline = self._next_deadline()
+            timeout = None if deadline is None else max(deadline - now, 0.0)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
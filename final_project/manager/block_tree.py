@@ -0,0 +1,99 @@
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional
+
+from constant import ORPHAN_BLOCK_LIMIT
+from messages.block import Block
+
+
+def block_work(difficulty: int) -> int:
+    """Expected hashes to find a block, `difficulty` leading hex zeros."""
+    return 16 ** difficulty
+
+
+class BlockTree:
+    """
+    Every valid block this node has seen, on any branch
+    Cumulative work is kept per block hash, so the heaviest tip is one lookup.
+    Blocks whose parent has not arrived yet wait until it does, at most
+    `orphan_limit` of them, the oldest are dropped first.
+    """
+
+    def __init__(self, orphan_limit: int = ORPHAN_BLOCK_LIMIT) -> None:
+        self.blocks: Dict[str, Block] = {}
+        self.work: Dict[str, int] = {}
+        self.orphan_limit = orphan_limit
+        # parent hash → blocks that arrived before it
+        self._waiting: Dict[str, List[Block]] = defaultdict(list)
+        # orphan hash → parent hash, oldest first
+        self._orphans: "OrderedDict[str, str]" = OrderedDict()
+
+    def __contains__(self, block_hash: str) -> bool:
+        return block_hash in self.blocks
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def add(self, block: Block) -> List[Block]:
+        """
+        Blocks that became part of the tree, `block` and any of its waiting
+        descendants. Empty when it is already known or its parent is missing
+        """
+        if block.hash in self.blocks:
+            return []
+        if block.previous_hash != "0" and block.previous_hash not in self.blocks:
+            self._add_orphan(block)
+            return []
+
+        connected = []
+        pending = [block]
+        while pending:
+            current = pending.pop()
+            parent = self.blocks.get(current.previous_hash)
+            expected_index = parent.index + 1 if parent is not None else 0
+            if current.hash in self.blocks or current.index != expected_index:
+                continue
+            parent_work = self.work.get(current.previous_hash, 0)
+            self.blocks[current.hash] = current
+            self.work[current.hash] = parent_work + block_work(current.difficulty)
+            connected.append(current)
+            pending.extend(self._adopt(current.hash))
+        return connected
+
+    def is_waiting(self, block_hash: str) -> bool:
+        """Whether the block is held until its own parent arrives."""
+        return block_hash in self._orphans
+
+    def _add_orphan(self, block: Block) -> None:
+        if block.hash in self._orphans:
+            return
+        self._waiting[block.previous_hash].append(block)
+        self._orphans[block.hash] = block.previous_hash
+        # Anyone can send blocks on parents that never come, keep it bounded
+        while len(self._orphans) > self.orphan_limit:
+            orphan_hash, parent_hash = self._orphans.popitem(last=False)
+            siblings = [b for b in self._waiting[parent_hash] if b.hash != orphan_hash]
+            if siblings:
+                self._waiting[parent_hash] = siblings
+            else:
+                del self._waiting[parent_hash]
+
+    def _adopt(self, parent_hash: str) -> List[Block]:
+        children = self._waiting.pop(parent_hash, [])
+        for child in children:
+            self._orphans.pop(child.hash, None)
+        return children
+
+    def heaviest(self, candidates: List[Block], current: Optional[str]) -> str:
+        """
+        The tip with the most work among `current` and `candidates`
+        Ties go to the lower hash rather than the first seen, so nodes that
+        mined competing blocks at the same height all settle on the same one
+        """
+        best = current
+        for block in candidates:
+            if best is None or self._rank(block.hash) > self._rank(best):
+                best = block.hash
+        return best
+
+    def _rank(self, block_hash: str):
+        return self.work[block_hash], -int(block_hash, 16)
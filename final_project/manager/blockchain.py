@@ -1,40 +1,48 @@
+from messages.betbatch import BetBatchPayload
 from messages.block import Block
+from manager.block_tree import BlockTree
 from pow.miner import Miner
 
 from db.mempool import Mempool
 from db.database import Database
 
 
-import time
 import random
 import math
 import hashlib
+import struct
 
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
 from dataclasses import asdict
 
 
-from constant import BLOCKS_PER_ROUND, DEFAULT_DIFFICULTY
+from constant import (
+    BLOCKS_PER_ROUND,
+    DEFAULT_DIFFICULTY,
+    MAX_BLOCK_BYTES,
+    MAX_BLOCK_TRANSACTIONS,
+)
+from utils import clock
 
 
 class BlockChain():
 
-    _instance = None
-
-    def __new__(cls, *args, **kwargs):
-        if cls._instance is None:
-            cls._instance = super(BlockChain, cls).__new__(cls)
-        return cls._instance
-
-    def __init__(self):
-        if hasattr(self, "_initialized"):
-            return
-        self._initialized = True
-
+    def __init__(
+        self,
+        mempool: Optional[Mempool] = None,
+        fork_choice: bool = False,
+        difficulty: int = DEFAULT_DIFFICULTY,
+    ):
+        # State is per node, so several nodes can share one process
         self.chain = []
-        self.mempool = Mempool()
-        self.db = Database()
+        self.mempool = mempool if mempool is not None else Mempool()
+        self.db = Database(self.mempool)
         self.miner = Miner()
+        # Fork choice: every branch is kept, `chain` is the heaviest one
+        self.tree = BlockTree() if fork_choice else None
+        self.reorgs = 0
+        # Genesis is mined at this, no valid block may claim less
+        self.difficulty = difficulty
 
     def _get_latest_block(self) -> Block:
         return self.chain[-1]
@@ -59,13 +67,18 @@ class BlockChain():
     def _get_round_number(self) -> int:
         return int(math.ceil(len(self.chain) / BLOCKS_PER_ROUND))
 
-    def _get_blocks_for_round(self) -> list[Block]:
-        round = self._get_round_number()
+    def _get_blocks_for_round(self, round: Optional[int] = None) -> list[Block]:
+        if round is None:
+            round = self._get_round_number()
         start_index = (round - 1) * BLOCKS_PER_ROUND
         end_index = start_index + BLOCKS_PER_ROUND
         return self.chain[start_index:end_index]
 
     def _add_block(self, block: Block):
+        """Appends a block that extends the tip, any other is refused."""
+        tip = self.chain[-1].hash if self.chain else "0"
+        if block.index != len(self.chain) or block.previous_hash != tip:
+            return False
         self.chain.append(block)
         if self.db:
             self.db.save_block(block._to_dict())
@@ -74,16 +87,19 @@ class BlockChain():
     def create_genesis_block(self) -> Block:
         genesis_block = Block(
             index=0,
-            timestamp=time.time(),
+            timestamp=clock.now(),
             transactions=[],
+            batches=[],
             previous_hash="0",
             winning_number=random.randint(1, 100),
             hash='genesis_hash',
             nonce=None,
-            difficulty=DEFAULT_DIFFICULTY,
+            difficulty=self.difficulty,
         )
 
         self.miner.mine_block(genesis_block)
+        if self.tree is not None:
+            self.tree.add(genesis_block)
 
         self.chain.append(genesis_block)
         if self.db:
@@ -92,19 +108,51 @@ class BlockChain():
         return genesis_block
 
     def create_block(
-        self
+        self, template: Optional[Block] = None
     ) -> Optional[Block]:
+        new_block = template if template is not None else self.prepare_block()
+        self.mempool.remove_transactions(new_block.transactions)
+        self.mempool.remove_transactions(new_block.batches)
+
+        self.miner.mine_block(new_block)
+
+        return self.commit_block(new_block)
+
+    def commit_block(self, block: Block) -> Block:
+        """Adds a block mined here, its transactions already taken out."""
+        if self.tree is not None:
+            self.connect_block(block)
+            return block
+        self.chain.append(block)
+        if self.db:
+            self.db.save_block(block._to_dict())
+        return block
+
+    def prepare_block(self) -> Block:
+        """An unmined block on the current tip, the mempool is left as it is."""
         if not self.mempool:
 
             transactions = []
         else:
-            transactions = self.mempool.get_all_transactions()
-            self.mempool.clear_mempool()
-
-        new_block = Block(
+            # Bounded in entries and in packed bytes, so the block fits in one
+            # datagram whatever the key type and batch size
+            transactions = self.mempool.get_transactions(MAX_BLOCK_TRANSACTIONS)
+            space = MAX_BLOCK_BYTES
+            for count, tx in enumerate(transactions):
+                space -= tx.packed_size
+                if space < 0:
+                    transactions = transactions[:count]
+                    break
+        batches = [tx for tx in transactions if isinstance(tx, BetBatchPayload)]
+        transactions = [
+            tx for tx in transactions if not isinstance(tx, BetBatchPayload)
+        ]
+
+        return Block(
             index=len(self.chain),
-            timestamp=time.time(),
+            timestamp=clock.now(),
             transactions=transactions,
+            batches=batches,
             previous_hash=self._get_latest_block().hash,
             winning_number=random.randint(1, 100),
             hash=None,
@@ -112,18 +160,96 @@ class BlockChain():
             difficulty=self._get_latest_block().difficulty,
         )
 
-        self.miner.mine_block(new_block)
+    def top_up_block(self, block: Block) -> Block:
+        """
+        Refreshes a prepared block's bets: those no longer pending are dropped,
+        the oldest pending ones not in it yet fill the room that is left
+        """
+        pending = self.mempool.has_transaction
+        block.transactions = [tx for tx in block.transactions if pending(tx.txid)]
+        block.batches = [tx for tx in block.batches if pending(tx.txid)]
+        included = {tx.txid for tx in block.transactions + block.batches}
+        room = MAX_BLOCK_TRANSACTIONS - len(included)
+        space = MAX_BLOCK_BYTES - sum(
+            tx.packed_size for tx in block.transactions + block.batches
+        )
+        # The block's own bets are the oldest, so the newcomers are in this slice
+        for tx in self.mempool.get_transactions(MAX_BLOCK_TRANSACTIONS):
+            if room <= 0:
+                break
+            if tx.txid in included:
+                continue
+            if tx.packed_size > space:
+                break
+            if isinstance(tx, BetBatchPayload):
+                block.batches.append(tx)
+            else:
+                block.transactions.append(tx)
+            room -= 1
+            space -= tx.packed_size
+        block._body_digest = None
+        return block
+
+    def connect_block(self, block: Block) -> Tuple[List[Block], List[Block]]:
+        """
+        Adds a block to the tree and moves `chain` to the heaviest tip
+        Returns the blocks that left and joined the main chain, both empty when
+        the block landed on a lighter branch or is waiting for its parent
+        """
+        connected = self.tree.add(block)
+        if not connected:
+            return [], []
+        current = self.chain[-1].hash if self.chain else None
+        tip = self.tree.heaviest(connected, current)
+        if tip == current:
+            return [], []
+        return self._switch_to(tip)
+
+    def _on_main_chain(self, block: Block) -> bool:
+        return (
+            block.index < len(self.chain) and self.chain[block.index].hash == block.hash
+        )
 
-        self.chain.append(new_block)
-        if self.db:
-            self.db.save_block(new_block._to_dict())
+    def _switch_to(self, tip_hash: str) -> Tuple[List[Block], List[Block]]:
+        # Walk back from the new tip until it meets the main chain
+        added = []
+        block = self.tree.blocks[tip_hash]
+        while block is not None and not self._on_main_chain(block):
+            added.append(block)
+            block = self.tree.blocks.get(block.previous_hash)
+        added.reverse()
+        fork = added[0].index
+        removed = self.chain[fork:]
+        del self.chain[fork:]
+        self.chain.extend(added)
+        if removed:
+            self.reorgs += 1
 
-        return new_block
+        if self.db:
+            for stale in removed[len(added):]:
+                self.db.blockchain_db.pop(f"block_{stale.index}", None)
+            for new in added:
+                self.db.save_block(new._to_dict())
+
+        # Bets only in the abandoned branch are pending again
+        included = {tx.txid for new in added for tx in new.transactions + new.batches}
+        for stale in removed:
+            for tx in stale.transactions + stale.batches:
+                if tx.txid not in included:
+                    self.mempool.add_transaction(tx.txid, tx)
+        for new in added:
+            self.mempool.remove_transactions(new.transactions)
+            self.mempool.remove_transactions(new.batches)
+        return removed, added
 
     def validate_block(self, block: Block) -> bool:
-        calculated_hash = hashlib.sha256(
-            block._calculate_hash_string(block.nonce).encode()
-        ).hexdigest()
+        try:
+            calculated_hash = hashlib.sha256(
+                block._calculate_hash_string(block.nonce).encode()
+            ).hexdigest()
+        except (ValueError, TypeError, struct.error):
+            print(f"Block {block.index} holds a bet that does not encode")
+            return False
 
         if calculated_hash != block.hash:
             print(
@@ -131,28 +257,71 @@ class BlockChain():
             )
             return False
 
-        return True
-
-    def get_winning_result(self):
-
-        round_blocks = self._get_blocks_for_round()
-        winning_block = random.choice(round_blocks)
-
-        winning_number = winning_block.winning_number
-
-        winner_list = {}
+        # Fork choice counts the claimed difficulty, so it has to be proven,
+        # and a floor keeps blocks from being free ('0' * 0 matches any hash)
+        if block.difficulty < self.difficulty:
+            print(f"Block {block.index} is below difficulty {self.difficulty}")
+            return False
+        if not block.hash.startswith('0' * block.difficulty):
+            print(f"Block {block.index} does not meet difficulty {block.difficulty}")
+            return False
 
-        total_amount = 0
+        if not all(self._bet_is_valid(bet) for bet in block.transactions):
+            print(f"Block {block.index} holds an invalid bet")
+            return False
+        if not all(self._bet_is_valid(batch) for batch in block.batches):
+            print(f"Block {block.index} holds an invalid bet batch")
+            return False
 
-        print("Winning Number: ", winning_number)
-        print("Length of Block: ", len(self.chain))
-        print("Round Block: ", len(round_blocks))
-        for block in round_blocks:
-            # print("Transaction Length: ", len(block.transactions))
-            for bet in block.transactions:
-                if winning_number == bet.bet_number:
-                    winner_list[bet.bettor_id] = winner_list.get(
-                        bet.bettor_id, 0) + bet.bet_amount
-                    total_amount = total_amount + bet.bet_amount
+        return True
 
-        return winning_number, total_amount, winner_list
+    def _bet_is_valid(self, tx) -> bool:
+        """
+        Signature check, skipped for a bet already in the mempool with the same
+        signature: it was verified when it arrived
+        """
+        known = self.mempool.get_transaction(tx.txid)
+        if known is not None and known.signature == tx.signature:
+            return True
+        return tx.is_valid()
+
+    def get_winning_result(
+        self, round: Optional[int] = None, round_blocks: Optional[list] = None
+    ):
+        if round_blocks is None:
+            round_blocks = self._get_blocks_for_round(round)
+        return winning_result(round_blocks)
+
+
+def winning_result(round_blocks: list):
+    """
+    (winning number, total amount, bettor → winnings) of a round's blocks
+    Reads only its argument, so it can run on an executor thread
+    """
+    if not round_blocks:
+        return None, 0, {}
+    # Drawn from the round's last hash, so every node settling the same
+    # blocks, and every re-settlement of them, picks the same winner
+    last_hash = round_blocks[-1].hash
+    winning_block = round_blocks[int(last_hash, 16) % len(round_blocks)]
+
+    winning_number = winning_block.winning_number
+
+    winner_list = {}
+
+    total_amount = 0
+
+    for block in round_blocks:
+        for bet in block.transactions:
+            if winning_number == bet.bet_number:
+                winner_list[bet.bettor_id] = winner_list.get(
+                    bet.bettor_id, 0) + bet.bet_amount
+                total_amount = total_amount + bet.bet_amount
+        for batch in block.batches:
+            for bet_number, bet_amount in batch.bets():
+                if winning_number == bet_number:
+                    winner_list[batch.bettor_id] = winner_list.get(
+                        batch.bettor_id, 0) + bet_amount
+                    total_amount = total_amount + bet_amount
+
+    return winning_number, total_amount, winner_list
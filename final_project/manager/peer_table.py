@@ -0,0 +1,146 @@
+import bisect
+import heapq
+import random
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from ipv8.types import Peer
+
+from constant import (
+    DEFAULT_PEER_RTT,
+    FETCH_HEDGE_TIMEOUT,
+    LOSS_ALPHA,
+    RTT_ALPHA,
+)
+from utils import clock
+
+
+@dataclass
+class PeerEntry:
+    peer: Peer
+    key_bin: bytes
+    key_hex: str
+    last_seen_timestamp: float = 0.0  # Sync watermark for transaction pulls
+    tx_received: int = 0
+    blocks_received: int = 0
+    added_at: float = field(default_factory=clock.now)
+
+    # Fetch statistics, updated from request / response pairs
+    rtt: Optional[float] = None  # Smoothed round trip time
+    rtt_var: float = 0.0
+    loss: float = 0.0  # Smoothed fraction of requests that timed out
+    requests_sent: int = 0
+    responses_received: int = 0
+
+    def record_response(self, rtt: float) -> None:
+        self.responses_received += 1
+        self.loss = (1 - LOSS_ALPHA) * self.loss
+        if self.rtt is None:
+            self.rtt = rtt
+            self.rtt_var = rtt / 2
+        else:
+            self.rtt_var = (1 - RTT_ALPHA) * self.rtt_var + RTT_ALPHA * abs(
+                self.rtt - rtt
+            )
+            self.rtt = (1 - RTT_ALPHA) * self.rtt + RTT_ALPHA * rtt
+
+    def record_loss(self) -> None:
+        self.loss = (1 - LOSS_ALPHA) * self.loss + LOSS_ALPHA
+
+    def score(self) -> float:
+        """Expected time to get an answer, lower is better."""
+        rtt = DEFAULT_PEER_RTT if self.rtt is None else self.rtt
+        return rtt / max(1.0 - self.loss, 0.05)
+
+    def hedge_timeout(self) -> float:
+        if self.rtt is None:
+            return FETCH_HEDGE_TIMEOUT
+        return max(FETCH_HEDGE_TIMEOUT, self.rtt + 4 * self.rtt_var)
+
+
+class PeerTable:
+    """
+    Registry of connected peers with their identities derived once
+    Keeps every id (ours included) in a sorted list so the
+    highest / lowest id lookups used for role selection are cheap. These run
+    on every PeerView received, joins and leaves are much rarer
+    Adding or removing a peer shifts the list, O(n) in the peer count. That
+    is nothing at the tens of peers IPv8's walker keeps (max_peers), and
+    still well under a millisecond at thousands. Beyond that a sorted
+    container or a heap would be needed
+    """
+
+    def __init__(self, my_peer: Peer) -> None:
+        self.my_key_bin = my_peer.public_key.key_to_bin()
+        self.my_key_hex = self.my_key_bin.hex()
+        self._by_mid: Dict[bytes, PeerEntry] = {}
+        self._by_hex: Dict[str, PeerEntry] = {}
+        self._ordered_ids: List[str] = [self.my_key_hex]
+
+    def __len__(self) -> int:
+        return len(self._by_mid)
+
+    def __contains__(self, peer: Peer) -> bool:
+        return peer.mid in self._by_mid
+
+    def __iter__(self) -> Iterator[PeerEntry]:
+        return iter(list(self._by_mid.values()))
+
+    def add(self, peer: Peer) -> PeerEntry:
+        entry = self._by_mid.get(peer.mid)
+        if entry is not None:
+            return entry
+        key_bin = peer.public_key.key_to_bin()
+        entry = PeerEntry(peer=peer, key_bin=key_bin, key_hex=key_bin.hex())
+        self._by_mid[peer.mid] = entry
+        self._by_hex[entry.key_hex] = entry
+        bisect.insort(self._ordered_ids, entry.key_hex)  # O(n), see the class
+        return entry
+
+    def remove(self, peer: Peer) -> Optional[PeerEntry]:
+        entry = self._by_mid.pop(peer.mid, None)
+        if entry is None:
+            return None
+        del self._by_hex[entry.key_hex]
+        index = bisect.bisect_left(self._ordered_ids, entry.key_hex)
+        if index < len(self._ordered_ids) and self._ordered_ids[index] == entry.key_hex:
+            del self._ordered_ids[index]
+        return entry
+
+    def get(self, peer: Peer) -> Optional[PeerEntry]:
+        return self._by_mid.get(peer.mid)
+
+    def get_by_mid(self, mid: bytes) -> Optional[PeerEntry]:
+        return self._by_mid.get(mid)
+
+    def get_by_hex(self, key_hex: str) -> Optional[PeerEntry]:
+        return self._by_hex.get(key_hex)
+
+    def peers(self) -> List[Peer]:
+        return [entry.peer for entry in self._by_mid.values()]
+
+    def best(self, count: int, exclude: Iterable[bytes] = ()) -> List[PeerEntry]:
+        """The `count` lowest-scored peers, skipping the given mids."""
+        excluded = set(exclude)
+        candidates = [e for m, e in self._by_mid.items() if m not in excluded]
+        return heapq.nsmallest(count, candidates, key=PeerEntry.score)
+
+    def select_fetch_peers(self, count: int) -> List[PeerEntry]:
+        """Best-scored peers plus one random other, so every peer keeps getting measured."""
+        chosen = self.best(count)
+        chosen_mids = {entry.peer.mid for entry in chosen}
+        others = [m for m in self._by_mid if m not in chosen_mids]
+        if others:
+            chosen.append(self._by_mid[random.choice(others)])
+        return chosen
+
+    def highest_id(self) -> str:
+        return self._ordered_ids[-1]
+
+    def lowest_id(self) -> str:
+        return self._ordered_ids[0]
+
+    def update_watermark(self, peer: Peer, timestamp: float) -> None:
+        entry = self._by_mid.get(peer.mid)
+        if entry is not None and timestamp > entry.last_seen_timestamp:
+            entry.last_seen_timestamp = timestamp
@@ -0,0 +1,38 @@
+import asyncio
+from typing import Awaitable, Callable, List
+
+from messages.block import Block
+from utils import clock
+
+
+class SettlementStage:
+    """
+    Settles closed rounds on a task of its own, in the order they closed
+    `submit()` only snapshots the round's blocks and queues them, so block
+    handling never waits for winners to be computed, stored or published
+    """
+
+    def __init__(self, settle: Callable[[int, List[Block]], Awaitable[None]]) -> None:
+        self.settle = settle
+        self.settled = 0
+        self.last_delay = 0.0  # seconds from round close to settled
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    def submit(self, round_number: int, blocks: List[Block]) -> None:
+        # A copy, the chain may move on (or reorganise) before this is settled
+        self.queue.put_nowait((round_number, list(blocks), clock.now()))
+
+    def pending(self) -> int:
+        return self.queue.qsize()
+
+    async def run(self) -> None:
+        while True:
+            round_number, blocks, closed_at = await self.queue.get()
+            try:
+                await self.settle(round_number, blocks)
+            except Exception as e:
+                # One bad round must not stop every later one from settling
+                print(f"Settlement of round {round_number} failed: {e!r}")
+                continue
+            self.settled += 1
+            self.last_delay = clock.now() - closed_at
@@ -0,0 +1,76 @@
+from ipv8.messaging.payload_dataclass import dataclass
+from ipv8.messaging.serialization import default_serializer
+
+
+import hashlib
+import struct
+
+from constant import MAX_BATCH_BETS
+from messages.signing import verify
+
+
+# bettor key length, then the key, bet count, the bets, then the timestamp
+_KEY_LENGTH = struct.Struct(">H")
+_BET = struct.Struct(">qq")
+_TIMESTAMP = struct.Struct(">d")
+
+
+@dataclass(msg_id=5)
+class BetBatchPayload:
+    """
+    Many (number, amount) bets from one bettor under a single signature
+    bet_numbers[i] goes with bet_amounts[i]
+    """
+
+    bettor_id: str
+    bet_numbers: list[int]
+    bet_amounts: list[int]
+    timestamp: float
+    signature: str
+
+    # Not a dataclass field (no annotation), so it is never serialized
+    _txid = None
+    _packed_size = None
+
+    def _encode(self) -> bytes:
+        """Canonical binary encoding of the batch, without the signature."""
+        key = bytes.fromhex(self.bettor_id)
+        return b"".join(
+            [
+                _KEY_LENGTH.pack(len(key)),
+                key,
+                _KEY_LENGTH.pack(len(self.bet_numbers)),
+                *(_BET.pack(n, a) for n, a in zip(self.bet_numbers, self.bet_amounts)),
+                _TIMESTAMP.pack(self.timestamp),
+            ]
+        )
+
+    @property
+    def packed_size(self) -> int:
+        """Bytes this batch adds to a packed Block, its list entry length included."""
+        if self._packed_size is None:
+            self._packed_size = len(default_serializer.pack_serializable(self)) + 2
+        return self._packed_size
+
+    @property
+    def txid(self) -> str:
+        if self._txid is None:
+            self._txid = hashlib.sha256(b"batch" + self._encode()).hexdigest()
+        return self._txid
+
+    def bets(self):
+        return zip(self.bet_numbers, self.bet_amounts)
+
+    def is_well_formed(self) -> bool:
+        if not 0 < len(self.bet_numbers) <= MAX_BATCH_BETS:
+            return False
+        if len(self.bet_numbers) != len(self.bet_amounts):
+            return False
+        return all(
+            type(n) is int and type(a) is int and 1 <= n <= 100 and a > 0
+            for n, a in self.bets()
+        )
+
+    def is_valid(self) -> bool:
+        """Shape and signature, one verification for every bet in the batch."""
+        return self.is_well_formed() and verify(self)
@@ -1,8 +1,16 @@
 from ipv8.messaging.payload_dataclass import dataclass
+from ipv8.messaging.serialization import default_serializer
 
 
 import hashlib
-import json
+import struct
+
+from messages.signing import verify
+
+
+# bettor key length, then the key, then number / amount / timestamp
+_KEY_LENGTH = struct.Struct(">H")
+_BET_FIELDS = struct.Struct(">qqd")
 
 
 @dataclass(msg_id=1)
@@ -13,13 +21,34 @@ class BetPayload:
     timestamp: float
     signature: str
 
-    def _generate_txid(self):
-        payload_data = {
-            "bettor_id": self.bettor_id,
-            "bet_number": self.bet_number,
-            "bet_amount": self.bet_amount,
-            "timestamp": self.timestamp,
-        }
-        payload_bytes = json.dumps(
-            payload_data, sort_keys=True).encode('utf-8')
-        return hashlib.sha256(payload_bytes).hexdigest()
+    # Not a dataclass field (no annotation), so it is never serialized
+    _txid = None
+    _packed_size = None
+
+    def _encode(self) -> bytes:
+        """
+        Canonical binary encoding of the bet, without the signature
+        Also the message the bettor signs, so it must never change layout
+        """
+        key = bytes.fromhex(self.bettor_id)
+        return (
+            _KEY_LENGTH.pack(len(key))
+            + key
+            + _BET_FIELDS.pack(self.bet_number, self.bet_amount, self.timestamp)
+        )
+
+    @property
+    def packed_size(self) -> int:
+        """Bytes this bet adds to a packed Block, its list entry length included."""
+        if self._packed_size is None:
+            self._packed_size = len(default_serializer.pack_serializable(self)) + 2
+        return self._packed_size
+
+    @property
+    def txid(self) -> str:
+        if self._txid is None:
+            self._txid = hashlib.sha256(self._encode()).hexdigest()
+        return self._txid
+
+    def is_valid(self) -> bool:
+        return verify(self)
@@ -1,10 +1,11 @@
 from ipv8.messaging.payload_dataclass import dataclass
 
+from messages.betbatch import BetBatchPayload
 from messages.betpayload import BetPayload
 
 
+import hashlib
 import json
-from dataclasses import asdict
 
 
 @dataclass(msg_id=4)
@@ -17,12 +18,18 @@ class Block:
     winning_number: int
     nonce: int
     difficulty: int  # Default is 1
+    batches: list[BetBatchPayload]
+    hops: int = 0  # Gossip relay count, not part of the block hash
+
+    # Not a dataclass field (no annotation), so it is never serialized
+    _body_digest = None
 
     def _to_dict(self):
         return {
             "index": self.index,
             "timestamp": self.timestamp,
             "transactions": self.transactions,
+            "batches": self.batches,
             "previous_hash": self.previous_hash,
             "winning_number": self.winning_number,
             "hash": self.hash,
@@ -31,14 +38,42 @@ class Block:
         }
 
     def _calculate_hash_string(self, nonce) -> str:
-        block_data = {
+        return self._header_prefix() + str(nonce)
+
+    def _header_prefix(self) -> str:
+        """
+        Everything the hash covers except the nonce
+        The bets are folded into one digest, so a nonce costs one small hash
+        and the header can be handed to pool workers without the bets
+        """
+        header = {
             "index": self.index,
             "timestamp": self.timestamp,
-            "transactions": [asdict(item) for item in self.transactions],
+            "body": self.body_digest,
             "previous_hash": self.previous_hash,
             "winning_number": self.winning_number,
             "difficulty": self.difficulty,
-            "nonce": nonce,
         }
-        block_string = json.dumps(block_data, sort_keys=True)
-        return block_string
+        return json.dumps(header, sort_keys=True) + ":"
+
+    @property
+    def body_digest(self) -> str:
+        """
+        Cached until the bets change (`BlockChain.top_up_block` resets it)
+        Each bet counts as its txid, which covers the signed fields, plus its
+        signature, so a rebuilt digest only hashes short strings
+        """
+        if self._body_digest is None:
+            digest = hashlib.sha256()
+            for item in self.transactions:
+                digest.update(f"{item.txid}:{item.signature}\n".encode())
+            digest.update(b"batches\n")
+            for item in self.batches:
+                digest.update(f"{item.txid}:{item.signature}\n".encode())
+            self._body_digest = digest.hexdigest()
+        return self._body_digest
+
+
+@dataclass(msg_id=12)
+class BlocksRequest:
+    start: int  # First height wanted, answered with main chain Blocks from there
@@ -0,0 +1,29 @@
+from ipv8.messaging.payload_dataclass import dataclass
+
+
+@dataclass(msg_id=7)
+class PoolJoin:
+    hash_rate: float  # Last measured hashes per second, 0 if never mined
+
+
+@dataclass(msg_id=8)
+class MiningJob:
+    job_id: int
+    header: str  # Block._header_prefix(), the nonce is appended to it
+    difficulty: int
+    start: int
+    stop: int
+
+
+@dataclass(msg_id=9)
+class MiningResult:
+    job_id: int
+    start: int
+    stop: int
+    nonce: int  # -1 when the range held no solution
+    hashes: int
+
+
+@dataclass(msg_id=10)
+class JobClosed:
+    job_id: int  # Sealed by someone, stop searching its ranges
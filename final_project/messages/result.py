@@ -7,3 +7,5 @@ class LotteryResult:
     winning_number: int
     total_amount: int
     winner_list: str
+    last_block: str  # Hash of the round's last block, a reorg gives a new result
+    hops: int = 0  # Gossip relay count
@@ -0,0 +1,30 @@
+import struct
+
+from ipv8.keyvault.crypto import default_eccrypto
+
+
+# Key types a node can sign with, see `ECCrypto.generate_key`
+# curve25519 is LibNaCL: Curve25519 for encryption, Ed25519 for signatures
+KEY_TYPES = ("very-low", "low", "medium", "high", "curve25519")
+
+
+def sign(private_key, payload) -> str:
+    """Hex signature over the payload's canonical binary encoding."""
+    return default_eccrypto.create_signature(private_key, payload._encode()).hex()
+
+
+def verify(payload) -> bool:
+    """
+    Checks `payload.signature` against `payload.bettor_id`
+    Both are hex, and both BetPayload and BetBatchPayload sign `_encode()`
+    """
+    try:
+        key = default_eccrypto.key_from_public_bin(bytes.fromhex(payload.bettor_id))
+        signature = bytes.fromhex(payload.signature)
+        # Pulled JSON is not type checked, out of range or mistyped fields
+        # fail to encode, which makes the bet invalid rather than an error
+        message = payload._encode()
+    except (ValueError, TypeError, struct.error):
+        return False
+    # LibNaCL keys return the message rather than True
+    return bool(default_eccrypto.is_valid_signature(key, message, signature))
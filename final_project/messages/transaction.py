@@ -4,9 +4,11 @@ from ipv8.messaging.payload_dataclass import dataclass
 @dataclass(msg_id=2)
 class TransactionsRequest:
     last_seen_timestamp: float
+    request_id: int = 0
 
 
 @dataclass(msg_id=3)
 class TransactionsResponse:
     transactions: str
     has_more: bool
+    request_id: int = 0  # Echo of the request being answered
@@ -0,0 +1,10 @@
+from ipv8.messaging.payload_dataclass import dataclass
+
+
+@dataclass(msg_id=11)
+class PeerView:
+    highest: str  # Highest peer key the sender knows of, the miner
+    highest_hops: int  # Distance to it, a departed key fades out at the hop limit
+    lowest: str  # Lowest peer key, the lottery broadcaster
+    lowest_hops: int
+    height: int  # Sender's chain length, genesis is only made while all are 0
@@ -1,18 +1,113 @@
-from ipv8.configuration import ConfigBuilder, Strategy, WalkerDefinition, default_bootstrap_defs
+from ipv8.configuration import (
+    Bootstrapper,
+    BootstrapperDefinition,
+    ConfigBuilder,
+    Strategy,
+    WalkerDefinition,
+    default_bootstrap_defs,
+)
 from ipv8_service import IPv8
 from ipv8.util import run_forever
 
 
 # make sure this module exists in your project
 from community.setup import MyCommunity
+from constant import DEFAULT_DIFFICULTY
 
 import random
 
 
-async def start_network(key: int):
+BASE_PORT = 8090  # node <key> listens on BASE_PORT + key - 1 outside public mode
+BOOTSTRAP_MODES = ("public", "static", "broadcast")
+LOCAL_HOSTS = ("127.0.0.1", "localhost")
+BOOTSTRAP_RETRY = 0.5  # seconds between local bootstrap rounds
+
+
+def parse_peers(spec: str) -> list:
+    """
+    "host:port,host:port" -> [(host, port), ...]
+    A port range such as "127.0.0.1:8090-8099" expands to one entry per port
+    """
+    peers = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        host, _, ports = item.rpartition(":")
+        first, _, last = ports.partition("-")
+        for port in range(int(first), int(last or first) + 1):
+            peers.append((host, port))
+    return peers
+
+
+def bootstrap_definitions(mode: str, peers: list) -> list:
+    """
+    public: the IPv8 internet trackers
+    static: introduce ourselves to a fixed list of addresses, no DNS, no trackers
+    broadcast: find nodes on the LAN with UDP broadcasts
+    """
+    if mode == "static":
+        return [
+            BootstrapperDefinition(
+                Bootstrapper.DispersyBootstrapper,
+                {
+                    "ip_addresses": peers,
+                    "dns_addresses": [],
+                    "bootstrap_timeout": BOOTSTRAP_RETRY,
+                },
+            )
+        ]
+    if mode == "broadcast":
+        return [
+            BootstrapperDefinition(
+                Bootstrapper.UDPBroadcastBootstrapper,
+                {"bootstrap_timeout": BOOTSTRAP_RETRY},
+            )
+        ]
+    return default_bootstrap_defs
+
+
+async def start_network(
+    key: int,
+    trace: bool = False,
+    metrics_port: int = None,
+    bootstrap: str = "public",
+    peers: list = (),
+    load: dict = None,
+    bets_per_transaction: int = 1,
+    key_type: str = "medium",
+    telemetry_socket: str = None,
+    mining_mode: str = "single",
+    difficulty: int = DEFAULT_DIFFICULTY,
+):
 
     builder = ConfigBuilder().clear_keys().clear_overlays()
-    builder.add_key("my peer", "medium", f"ec_{key}.pem")
+    # "medium" keeps the original ec_<key>.pem, other types get their own file
+    key_file = f"ec_{key}.pem" if key_type == "medium" else f"{key_type}_{key}.pem"
+    builder.add_key("my peer", key_type, key_file)
+
+    settings = {
+        "node_id": f"node_{key}",
+        "trace_path": f"data/node_{key}/inbound.trace" if trace else None,
+        "metrics_port": metrics_port,
+        "bets_per_transaction": bets_per_transaction,
+        "telemetry_socket": telemetry_socket,
+        "mining_mode": mining_mode,
+        "difficulty": difficulty,
+    }
+    if load:
+        # load_tps, load_profile, load_duration
+        settings.update(load)
+    if bootstrap != "public":
+        # Fixed ports so a static peer list can name every node up front
+        port = BASE_PORT + key - 1
+        builder.set_port(port)
+        peers = [
+            (host, peer_port)
+            for host, peer_port in peers
+            if not (peer_port == port and host in LOCAL_HOSTS)
+        ]
+    if bootstrap == "static" and peers:
+        # All listed nodes, or a stable majority of them, starts the chain
+        settings["expected_peers"] = len(peers)
+        settings["network_quorum"] = len(peers) // 2 + 1
 
     builder.add_overlay(
         "MyCommunity",
@@ -20,12 +115,16 @@ async def start_network(key: int):
         [
             WalkerDefinition(Strategy.RandomWalk, 10, {"timeout": 3.0})
         ],  # 10 optimal to converge
-        default_bootstrap_defs,
-        {"node_id": f"node_{key}"},
+        bootstrap_definitions(bootstrap, list(peers)),
+        settings,
         [("started",)],
     )
 
-    await IPv8(builder.finalize(),
-               extra_communities={'MyCommunity': MyCommunity}).start()
+    ipv8 = IPv8(builder.finalize(), extra_communities={'MyCommunity': MyCommunity})
+    await ipv8.start()
 
-    await run_forever()
+    # SIGINT / SIGTERM end the wait, unloading the overlay flushes its logs
+    try:
+        await run_forever()
+    finally:
+        await ipv8.stop()
@@ -1,17 +1,91 @@
 from messages.block import Block
+import asyncio
 import time
 import hashlib
+from itertools import count
+from typing import Callable, Optional, Tuple
 
-from constant import DEFAULT_DIFFICULTY
+from constant import MINING_CHUNK
+
+
+def search(header: str, difficulty: int, start: int, stop: Optional[int] = None):
+    """
+    First nonce in [start, stop) whose hash meets `difficulty`, or None
+    The header is hashed once, each nonce only extends a copy of that state
+    """
+    target = '0' * difficulty
+    base = hashlib.sha256(header.encode())
+    for nonce in count(start) if stop is None else range(start, stop):
+        attempt = base.copy()
+        attempt.update(str(nonce).encode())
+        if attempt.hexdigest().startswith(target):
+            return nonce
+    return None
 
 
 class Miner:
 
+    def __init__(self):
+        # Cumulative work, read by the metrics endpoint
+        self.total_hashes = 0
+        self.total_seconds = 0.0
+        self.blocks_mined = 0
+        self.last_hash_rate = 0.0
+
     def mine_block(self, block):
         print("Mining Block")
 
         nonce, difficulty, elapsed = self._calculate_nonce(block)
+        return self._seal(block, nonce, difficulty, elapsed)
+
+    async def mine_block_async(
+        self, block, is_stale: Callable[[], bool], chunk: int = MINING_CHUNK
+    ) -> Optional[Block]:
+        """
+        Same search as `mine_block`, yielding to the event loop every `chunk`
+        nonces. Gives up and returns None once `is_stale()`, e.g. a heavier
+        tip arrived while this block was being mined on the old one
+        """
+        start_time = time.time()
+        found, hashes = await self.search_async(
+            block._header_prefix(), block.difficulty, 0, None, is_stale, chunk
+        )
+        elapsed = time.time() - start_time
+        if found is None:
+            self._record_work(hashes, elapsed, mined=False)
+            return None
+        self._record_work(hashes, elapsed)
+        difficulty = self._adjust_difficulty(elapsed, block.difficulty)
+        return self._seal(block, found, difficulty, elapsed)
 
+    async def search_async(
+        self,
+        header: str,
+        difficulty: int,
+        start: int,
+        stop: Optional[int],
+        is_stale: Callable[[], bool],
+        chunk: int = MINING_CHUNK,
+    ) -> Tuple[Optional[int], int]:
+        """(nonce or None, hashes tried), yielding every `chunk` nonces."""
+        nonce = start
+        while stop is None or nonce < stop:
+            end = nonce + chunk if stop is None else min(nonce + chunk, stop)
+            found = search(header, difficulty, nonce, end)
+            if found is not None:
+                return found, found - start + 1
+            nonce = end
+            await asyncio.sleep(0)
+            if is_stale():
+                break
+        return None, nonce - start
+
+    def seal_found(self, block, nonce: int, hashes: int, elapsed: float) -> Block:
+        """Seals a block whose nonce was found by a pool search, not `mine_block`."""
+        self._record_work(hashes, elapsed)
+        return self._seal(block, nonce, block.difficulty, elapsed)
+
+    def _seal(self, block, nonce, difficulty, elapsed):
         # Mutate block
         block.nonce = nonce
         block.difficulty = difficulty  # Assign the updated difficulty
@@ -32,26 +106,30 @@ class Miner:
         return block
 
     def _calculate_nonce(self, block):
-        nonce = 0
         start_time = time.time()
 
-        while True:
-            block_data = block._calculate_hash_string(nonce)
-            block_hash = hashlib.sha256(block_data.encode()).hexdigest()
-            # print("Trying Nonce :", nonce)
-            # print("Hash :", block_hash)
-            if block_hash.startswith('0' * block.difficulty):
+        nonce = search(block._header_prefix(), block.difficulty, 0)
 
-                elapsed = time.time() - start_time
-                # print("Time Taken For Mining: ", elapsed)
-                difficulty = self._adjust_difficulty(elapsed, block.difficulty)
-                return nonce, difficulty, elapsed
-            nonce += 1
+        elapsed = time.time() - start_time
+        self._record_work(nonce + 1, elapsed)
+        # print("Time Taken For Mining: ", elapsed)
+        difficulty = self._adjust_difficulty(elapsed, block.difficulty)
+        return nonce, difficulty, elapsed
+
+    def _record_work(self, hashes, elapsed, mined=True):
+        self.total_hashes += hashes
+        self.total_seconds += elapsed
+        if not mined:
+            return
+        self.blocks_mined += 1
+        if elapsed > 0:
+            self.last_hash_rate = hashes / elapsed
 
     def _adjust_difficulty(self, elapsed_time, difficulty):
 
         # Soft Capping For Now ( Cuz I don't want to deal with Float, or Large Integer)
-        return DEFAULT_DIFFICULTY
+        # The block keeps the difficulty it was searched at, see --difficulty
+        return difficulty
 
         if elapsed_time < TARGET_BLOCK_TIME:
             return difficulty + 1
@@ -0,0 +1,127 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+
+from constant import POOL_RANGE_SIZE, POOL_RANGE_TIMEOUT
+from utils import clock
+
+
+@dataclass
+class PoolWorker:
+    key_hex: str
+    hash_rate: float = 0.0
+    hashes: int = 0
+    ranges_done: int = 0
+    ranges_expired: int = 0
+    busy: Optional[Tuple[int, int]] = None  # range it is working on
+
+
+class MiningPool:
+    """
+    Nonce ranges of the current block header, handed out to pool workers
+    The designated miner opens a job per block, every worker (and the miner
+    itself) pulls one range at a time. Ranges not reported back within
+    `timeout` go back to the queue for whoever asks next
+    """
+
+    def __init__(
+        self, range_size: int = POOL_RANGE_SIZE, timeout: float = POOL_RANGE_TIMEOUT
+    ) -> None:
+        self.range_size = range_size
+        self.timeout = timeout
+        self.workers: Dict[str, PoolWorker] = {}
+        self.job_id = 0
+        self.header: Optional[str] = None
+        self.difficulty = 0
+        self.solution: Optional[int] = None
+        self._next_start = 0
+        self._returned: Deque[Tuple[int, int]] = deque()
+        # range → (worker key, deadline)
+        self._assigned: Dict[Tuple[int, int], Tuple[str, float]] = {}
+
+    def join(self, key_hex: str, hash_rate: float) -> PoolWorker:
+        worker = self.workers.get(key_hex)
+        if worker is None:
+            worker = self.workers[key_hex] = PoolWorker(key_hex)
+        worker.hash_rate = hash_rate
+        return worker
+
+    def leave(self, key_hex: str) -> None:
+        worker = self.workers.pop(key_hex, None)
+        if worker is not None and worker.busy is not None:
+            self._give_back(worker.busy)
+
+    def open(self, header: str, difficulty: int) -> int:
+        """A new job replaces the previous one, its ranges are forgotten."""
+        self.job_id += 1
+        self.header = header
+        self.difficulty = difficulty
+        self.solution = None
+        self._next_start = 0
+        self._returned.clear()
+        self._assigned.clear()
+        for worker in self.workers.values():
+            worker.busy = None
+        return self.job_id
+
+    def close(self) -> None:
+        self.header = None
+
+    @property
+    def active(self) -> bool:
+        return self.header is not None and self.solution is None
+
+    def assign(self, key_hex: str) -> Optional[Tuple[int, int]]:
+        """The next range for a worker, re-queued expired ones first."""
+        if not self.active:
+            return None
+        if self._returned:
+            nonce_range = self._returned.popleft()
+        else:
+            nonce_range = (self._next_start, self._next_start + self.range_size)
+            self._next_start += self.range_size
+        self._assigned[nonce_range] = (key_hex, clock.now() + self.timeout)
+        worker = self.workers.get(key_hex)
+        if worker is not None:
+            worker.busy = nonce_range
+        return nonce_range
+
+    def complete(
+        self, job_id: int, key_hex: str, nonce_range: Tuple[int, int], hashes: int
+    ) -> bool:
+        """Records a finished range, False when it belongs to an old job."""
+        if job_id != self.job_id:
+            return False
+        self._assigned.pop(nonce_range, None)
+        worker = self.workers.get(key_hex)
+        if worker is not None:
+            worker.hashes += hashes
+            worker.ranges_done += 1
+            if worker.busy == nonce_range:
+                worker.busy = None
+        return True
+
+    def expire(self) -> List[str]:
+        """Re-queues overdue ranges, returns the workers that let them lapse."""
+        now = clock.now()
+        late = [r for r, (_, deadline) in self._assigned.items() if deadline <= now]
+        lapsed = []
+        for nonce_range in late:
+            key_hex, _ = self._assigned.pop(nonce_range)
+            self._give_back(nonce_range)
+            worker = self.workers.get(key_hex)
+            if worker is not None:
+                worker.ranges_expired += 1
+                worker.busy = None
+                lapsed.append(key_hex)
+        return lapsed
+
+    def _give_back(self, nonce_range: Tuple[int, int]) -> None:
+        self._assigned.pop(nonce_range, None)
+        self._returned.append(nonce_range)
+
+    def worker_hashes(self) -> int:
+        return sum(worker.hashes for worker in self.workers.values())
+
+    def idle_workers(self) -> List[str]:
+        return [key for key, worker in self.workers.items() if worker.busy is None]
@@ -0,0 +1,46 @@
+"""
+Offline replay of a recorded message trace.
+
+Pushes every message in a trace (recorded with `python main.py N --trace`)
+through a fresh node's handlers with no networking, then prints throughput
+and per-message-type handler cost as JSON.
+
+    python replay.py data/node_3/inbound.trace
+    python replay.py data/node_3/inbound.trace --speed 1 --profile replay.prof
+"""
+
+import argparse
+import asyncio
+import contextlib
+import cProfile
+import json
+
+from simulation.replay import replay
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("trace", help="trace file to replay")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=0.0,
+        help="0 (default) as fast as possible, 1 recorded speed, 2 twice as fast",
+    )
+    parser.add_argument("--profile", help="write cProfile stats to this file")
+    parser.add_argument("--log", default="replay.log", help="node output goes here")
+    args = parser.parse_args()
+
+    profiler = cProfile.Profile() if args.profile else None
+    with open(args.log, "w") as log, contextlib.redirect_stdout(log):
+        if profiler:
+            profiler.enable()
+        report = asyncio.run(replay(args.trace, args.speed))
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@
 
 for i in {1..10}
 do
-  python main.py $i &
+  python main.py $i --bootstrap static --peers 127.0.0.1:8090-8099 &
   sleep 0.2
 done
 
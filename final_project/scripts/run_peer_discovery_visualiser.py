@@ -1,35 +1,50 @@
 """
 Live peer graph merger and visualizer.
 
-• Watches `data/*/peer_discovery.json` and merges discovered peers
-• Generates a graph frame every second using matplotlib
+• Sleeps on file change notifications (inotify) for `data/*/peer_discovery.jsonl`
+• Tails only the logs that changed and merges newly discovered peers
+• Draws a frame only when the graph changed, placing only the new nodes
+• With --telemetry it tails the collector's log instead of data/
 • Outputs:
     - combined_peer_graph.json
-    - peer_discovery.gif
+    - peer_discovery.gif, appended one frame at a time
+
+    python scripts/run_peer_discovery_visualiser.py
+    python scripts/run_peer_discovery_visualiser.py --telemetry data/telemetry.log
 """
 
+import argparse
 import json
+import os
 import pathlib
-import time
+import sys
 from typing import Dict, Set
-from io import BytesIO
 
-import networkx as nx
+import matplotlib
+
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
-import imageio.v2 as imageio
+import networkx as nx
+from PIL import Image
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+from utils.discovery_log import DiscoveryLogReader
+from utils.file_watch import FileWatcher
+from utils.gif_stream import GifStreamWriter
+from utils.telemetry import read_new_chunks
 
 DATA_DIR = pathlib.Path("data")
 OUTPUT_FILE = pathlib.Path("combined_peer_graph.json")
 GIF_PATH = "peer_discovery.gif"
-POLL_INTERVAL = 1.0  # seconds
+LOG_NAME = "peer_discovery.jsonl"
+DEBOUNCE = 0.25  # seconds to gather a burst of writes into one frame
 FRAME_DURATION = 0.4  # seconds
 NODE_LABELS: Dict[str, str] = {}
 
 
-mtime_cache: Dict[pathlib.Path, float] = {}
-graph: Dict[str, Set[str]] = {}
-layout_cache = {}
-gif_frames: list[BytesIO] = []
+readers: Dict[pathlib.Path, DiscoveryLogReader] = {}
+graph = nx.DiGraph()
+layout: Dict[str, tuple] = {}
 
 
 def log(msg: str):
@@ -40,65 +55,78 @@ def warn(msg: str):
     print(f"[WARN] {msg}")
 
 
-def error(msg: str):
-    print(f"[ERROR] {msg}")
-
-
-def safe_load_json(path: pathlib.Path):
-    try:
-        with path.open() as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        error(f"JSON decoding failed: {path}")
-        return None
+def process_file(node_dir: pathlib.Path) -> int:
+    """Merges the edges appended since the last call, returns how many were new."""
+    peer_file = node_dir / LOG_NAME
+    reader = readers.get(peer_file)
+    if reader is None:
+        reader = readers[peer_file] = DiscoveryLogReader(str(peer_file))
 
+    added = 0
+    for src, dst in reader.poll():
+        if not graph.has_edge(src, dst):
+            graph.add_edge(src, dst)
+            added += 1
+        # Assign label once
+        if src not in NODE_LABELS:
+            NODE_LABELS[src] = node_dir.name
+    return added
 
-def process_file(node_dir: pathlib.Path):
-    peer_file = node_dir / "peer_discovery.json"
-    if not peer_file.exists():
-        return
 
-    mtime = peer_file.stat().st_mtime
-    if mtime_cache.get(peer_file) == mtime:
-        return
+class TelemetryTail:
+    """Peer events appended to the collector log since the last poll."""
 
-    mtime_cache[peer_file] = mtime
-    records = safe_load_json(peer_file)
-    if not isinstance(records, dict):
-        warn(f"Skipping malformed file: {peer_file}")
-        return
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self.offset = 0
 
-    for src, peers in records.items():
-        bucket = graph.setdefault(src, set())
-        bucket.update(peers)
-        # Assign label once
-        if src not in NODE_LABELS:
-            NODE_LABELS[src] = node_dir.name
+    def process(self) -> int:
+        chunks, self.offset = read_new_chunks(str(self.path), self.offset)
+        added = 0
+        for chunk in chunks:
+            for node, kind, src, dst in zip(
+                chunk["node"], chunk["kind"], chunk["a"], chunk["b"]
+            ):
+                if kind != "peer":
+                    continue
+                if not graph.has_edge(src, dst):
+                    graph.add_edge(src, dst)
+                    added += 1
+                NODE_LABELS.setdefault(src, node)
+        return added
 
 
 def write_output_json():
-    with OUTPUT_FILE.open("w") as f:
-        json.dump({k: sorted(v) for k, v in graph.items()}, f, indent=2)
+    data = {n: sorted(graph.successors(n)) for n in graph.nodes if graph.out_degree(n)}
+    tmp = OUTPUT_FILE.with_suffix(".tmp")
+    with tmp.open("w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, OUTPUT_FILE)
 
 
-def render_graph_to_buffer(graph_data: Dict[str, list]) -> BytesIO:
-    G = nx.DiGraph()
-    for src, targets in graph_data.items():
-        for dst in targets:
-            G.add_edge(src, dst)
+def update_layout():
+    """Existing nodes stay where they are, only new ones are placed."""
+    new_nodes = [n for n in graph.nodes if n not in layout]
+    if not new_nodes:
+        return
+    if not layout:
+        layout.update(nx.circular_layout(graph))
+        return
+    pos = nx.spring_layout(
+        graph, pos=dict(layout), fixed=list(layout), iterations=20, seed=1
+    )
+    layout.update({n: pos[n] for n in new_nodes})
 
-    global layout_cache
-    if set(G.nodes) != set(layout_cache.keys()):
-        layout_cache = nx.circular_layout(G)
 
+def render_frame() -> Image.Image:
     fig, ax = plt.subplots(figsize=(10, 8))
-    labels = {n: NODE_LABELS.get(n, n) for n in G.nodes}
+    labels = {n: NODE_LABELS.get(n, n) for n in graph.nodes}
     nx.draw_networkx_labels(
-        G, pos=layout_cache, labels=labels, font_size=8, font_color="black", ax=ax
+        graph, pos=layout, labels=labels, font_size=8, font_color="black", ax=ax
     )
     nx.draw(
-        G,
-        pos=layout_cache,
+        graph,
+        pos=layout,
         node_size=300,
         node_color="skyblue",
         edge_color="gray",
@@ -108,50 +136,74 @@ def render_graph_to_buffer(graph_data: Dict[str, list]) -> BytesIO:
     )
     ax.set_title("Peer Discovery")
 
-    buf = BytesIO()
-    plt.savefig(buf, format="png", dpi=150)
+    fig.canvas.draw()
+    frame = Image.frombuffer(
+        "RGBA", fig.canvas.get_width_height(), fig.canvas.buffer_rgba()
+    ).convert("RGB")
     plt.close(fig)
-    buf.seek(0)
-    return buf
+    return frame
 
 
-def update_gif():
-    if not gif_frames:
-        warn("No frames to render GIF.")
-        return
-    imageio.mimsave(GIF_PATH, gif_frames)
-    log(f"GIF updated with {len(gif_frames)} frames → {GIF_PATH}")
+def watch_node_dir(watcher: FileWatcher, node_dir: pathlib.Path) -> int:
+    watcher.watch(str(node_dir))
+    # Anything written before the watch was set up
+    return process_file(node_dir)
 
 
 def main():
-    graph.clear()
-    layout_cache.clear()
-    gif_frames.clear()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--telemetry", help="tail this collector log, not data/")
+    args = parser.parse_args()
 
     if OUTPUT_FILE.exists():
         OUTPUT_FILE.unlink()
-
-    step = 0
-    while True:
-        for node_dir in DATA_DIR.iterdir():
-            if node_dir.is_dir():
-                process_file(node_dir)
-
-        write_output_json()
-
-        with OUTPUT_FILE.open() as f:
-            graph_data = json.load(f)
-
-        frame_buf = render_graph_to_buffer(graph_data)
-        gif_frames.append(imageio.imread(frame_buf))
-        log(f"Captured in-memory frame {step}")
-
-        # batch render every 5 frames
-        if step % 5 == 0:
-            update_gif()
-
-        step += 1
-        time.sleep(POLL_INTERVAL)
+    DATA_DIR.mkdir(exist_ok=True)
+
+    watcher = FileWatcher()
+    tail = None
+    if args.telemetry:
+        tail = TelemetryTail(pathlib.Path(args.telemetry))
+        tail.path.parent.mkdir(parents=True, exist_ok=True)
+        watcher.watch(str(tail.path.parent))
+    else:
+        watcher.watch(str(DATA_DIR))
+    if not watcher.uses_inotify:
+        warn("inotify unavailable, polling for changes")
+
+    gif = GifStreamWriter(GIF_PATH, FRAME_DURATION)
+    if tail is not None:
+        added = tail.process()
+    else:
+        added = sum(
+            watch_node_dir(watcher, d)
+            for d in sorted(DATA_DIR.iterdir())
+            if d.is_dir()
+        )
+    try:
+        while True:
+            if added:
+                write_output_json()
+                update_layout()
+                gif.append(render_frame())
+                log(f"Frame {gif.frames}: {added} new edges → {GIF_PATH}")
+
+            changed = watcher.wait()
+            # A discovery burst is many appends, fold it into one frame
+            changed |= watcher.wait(DEBOUNCE)
+            added = 0
+            for path in sorted(map(pathlib.Path, changed)):
+                if tail is not None:
+                    if path.name == tail.path.name:
+                        added += tail.process()
+                elif path.parent == DATA_DIR and path.is_dir():
+                    added += watch_node_dir(watcher, path)
+                elif path.name == LOG_NAME:
+                    added += process_file(path.parent)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        gif.close()
+        watcher.close()
 
 
 if __name__ == "__main__":
@@ -1,37 +1,117 @@
-import json, pathlib
+"""
+Incremental per-round transaction coverage tables.
+
+• Reads only the node log index files to fingerprint every round
+• Renders rounds that are new or whose records changed since the last run,
+  across a process pool, reading just those rounds' records by offset
+• round_reports/manifest.json remembers what has been rendered
+• With --telemetry it reads the collector's log instead of data/
+
+    python scripts/run_transaction_sync_report.py
+    python scripts/run_transaction_sync_report.py --workers 8 --force
+    python scripts/run_transaction_sync_report.py --telemetry data/telemetry.log
+"""
+
+import argparse, hashlib, json, os, pathlib, sys
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+from utils.telemetry import read_columns
+from utils.transaction_log import read_index, read_round
+
 DATA_DIR = pathlib.Path("data")
 OUT_DIR = pathlib.Path("round_reports")
-OUT_DIR.mkdir(exist_ok=True)
+MANIFEST = OUT_DIR / "manifest.json"
+
 
 # ────────────────────────────────────────────────────────────────
-#  In-memory structures
-#     round  -> node -> set(tx_hash)
-#     round  -> tx_hash -> earliest_timestamp
+#  Manifest: round -> fingerprint of the records it was rendered from
 # ────────────────────────────────────────────────────────────────
-round_node_hashes = defaultdict(lambda: defaultdict(set))
-round_hash_earliest = defaultdict(lambda: defaultdict(lambda: float("inf")))
-
-for node_dir in DATA_DIR.iterdir():
-    if not node_dir.is_dir():
-        continue
-    log_file = node_dir / "transactions_log.json"
-    if not log_file.exists():
-        continue
-
-    with log_file.open() as f:
-        records = json.load(f)
-
-    for entry in records:
-        rnd = entry["round"]
-        node = entry["node_name"]
-        for tx_hash, meta in entry["transactions"].items():
-            ts = float(meta["timestamp"])
-            round_node_hashes[rnd][node].add(tx_hash)
-            if ts < round_hash_earliest[rnd][tx_hash]:
-                round_hash_earliest[rnd][tx_hash] = ts
+def load_manifest() -> dict:
+    try:
+        with MANIFEST.open() as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(manifest: dict):
+    tmp = MANIFEST.with_suffix(".tmp")
+    with tmp.open("w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, MANIFEST)
+
+
+def scan_indexes():
+    """
+    round -> fingerprint, and node dir -> index, from the small .idx files
+    A round's fingerprint changes when any node writes a record for it
+    """
+    indexes = {}
+    parts = defaultdict(list)
+    for node_dir in sorted(DATA_DIR.iterdir()):
+        if not node_dir.is_dir():
+            continue
+        index = read_index(str(node_dir))
+        if not index:
+            continue
+        indexes[node_dir] = index
+        for rnd, spans in index.items():
+            parts[rnd].append(f"{node_dir.name}:{spans}")
+    fingerprints = {
+        str(rnd): hashlib.sha1("|".join(p).encode()).hexdigest()
+        for rnd, p in parts.items()
+    }
+    return fingerprints, indexes
+
+
+def load_round(rnd: int, indexes: dict):
+    """
+    node -> sorted tx hashes, and tx hash -> earliest timestamp, for one round
+    Only that round's records are read, straight from their offsets
+    """
+    per_node = defaultdict(set)
+    earliest = {}
+    for node_dir, index in indexes.items():
+        if rnd not in index:
+            continue
+        for entry in read_round(str(node_dir), rnd, index):
+            node = entry["node_name"]
+            for tx_hash, meta in entry["transactions"].items():
+                ts = float(meta["timestamp"])
+                per_node[node].add(tx_hash)
+                if ts < earliest.get(tx_hash, float("inf")):
+                    earliest[tx_hash] = ts
+    return {n: sorted(h) for n, h in per_node.items()}, earliest
+
+
+def scan_telemetry(path: str):
+    """
+    round -> fingerprint, and round -> (per_node, earliest) as load_round
+    returns it, from the tx events of the collector log
+    """
+    ev = read_columns(path, "tx")
+    per_round = defaultdict(lambda: defaultdict(set))
+    earliest = defaultdict(dict)
+    for node, tx_hash, rnd, ts in zip(ev["node"], ev["a"], ev["b"], ev["c"]):
+        per_round[rnd][node].add(tx_hash)
+        if ts < earliest[rnd].get(tx_hash, float("inf")):
+            earliest[rnd][tx_hash] = ts
+    rounds = {
+        rnd: ({n: sorted(h) for n, h in per_node.items()}, earliest[rnd])
+        for rnd, per_node in per_round.items()
+    }
+    fingerprints = {
+        str(rnd): hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()
+        for rnd, data in rounds.items()
+    }
+    return fingerprints, rounds
 
 
 # ────────────────────────────────────────────────────────────────
@@ -42,12 +122,10 @@ def short(h):
 
 
 # ────────────────────────────────────────────────────────────────
-#  Generate and render tables per round
+#  Render one round's table (runs in a worker process)
 # ────────────────────────────────────────────────────────────────
-for rnd in sorted(round_node_hashes):
-    per_node = round_node_hashes[rnd]
-    earliest = round_hash_earliest[rnd]
-
+def render_round(rnd: int, per_node: dict, earliest: dict) -> str:
+    per_node = {n: set(h) for n, h in per_node.items()}
     canon_hashes = sorted(earliest, key=lambda h: (earliest[h], h))
     label = {h: str(i + 1) for i, h in enumerate(canon_hashes)}
     node_list = sorted(per_node.keys())
@@ -96,5 +174,47 @@ for rnd in sorted(round_node_hashes):
 
     out = OUT_DIR / f"round_{rnd}.png"
     plt.savefig(out, dpi=150)
-    plt.close()
-    print(f"[✓] saved {out}")
+    plt.close(fig)
+    return str(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--force", action="store_true", help="re-render every round")
+    parser.add_argument("--telemetry", help="read this collector log, not data/")
+    args = parser.parse_args()
+
+    OUT_DIR.mkdir(exist_ok=True)
+    manifest = {} if args.force else load_manifest()
+    if args.telemetry:
+        fingerprints, rounds = scan_telemetry(args.telemetry)
+        load = rounds.__getitem__
+    else:
+        fingerprints, indexes = scan_indexes()
+        load = lambda rnd: load_round(rnd, indexes)
+
+    stale = [
+        int(rnd)
+        for rnd, fp in fingerprints.items()
+        if manifest.get(rnd) != fp or not (OUT_DIR / f"round_{rnd}.png").exists()
+    ]
+    print(f"[i] {len(fingerprints)} rounds, {len(stale)} to render")
+    if not stale:
+        return
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(render_round, rnd, *load(rnd)): rnd
+            for rnd in sorted(stale)
+        }
+        for future in as_completed(futures):
+            rnd = futures[future]
+            print(f"[✓] saved {future.result()}")
+            # Recorded as each round lands, so an interrupted run resumes
+            manifest[str(rnd)] = fingerprints[str(rnd)]
+            save_manifest(manifest)
+
+
+if __name__ == "__main__":
+    main()
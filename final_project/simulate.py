@@ -0,0 +1,138 @@
+"""
+In-process network simulator.
+
+Runs N nodes in one event loop over ipv8's in-memory endpoint, with a
+virtual clock, then prints throughput and propagation figures as JSON.
+Link latency, loss, bandwidth and partitions come from a scenario file
+(see simulation/scenarios/), command line flags override its values.
+
+    python simulate.py --nodes 200 --duration 120 --seed 1
+    python simulate.py --scenario simulation/scenarios/wan_partition.json
+    python simulate.py --nodes 20 --load-tps 50 --load-profile bursty
+    python simulate.py --nodes 20 --mining competitive
+    python simulate.py --nodes 20 --mining pool --difficulty 4
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sys
+import time
+
+from constant import DEFAULT_DIFFICULTY, MINING_MODES
+from simulation.conditions import NetworkConditions
+from simulation.loop import VirtualTimeLoop
+from simulation.network import Simulation
+from utils import clock
+from utils.load_generator import PROFILES, parse_bets_per_tx
+
+
+# Fixed epoch so block and bet timestamps are reproducible
+SIMULATION_EPOCH = 1_700_000_000.0
+
+
+async def run(
+    nodes: int,
+    duration: float,
+    seed: int,
+    network: dict,
+    load: dict,
+    mining: str = "single",
+    difficulty: int = DEFAULT_DIFFICULTY,
+) -> dict:
+    loop = asyncio.get_running_loop()
+    clock.use_clock(lambda: SIMULATION_EPOCH + loop.time())
+    simulation = Simulation(
+        nodes, seed, NetworkConditions(network, seed), load, mining, difficulty
+    )
+    await simulation.start()
+    await asyncio.sleep(duration)
+    await simulation.stop()
+    return simulation.report(duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenario", help="JSON scenario file")
+    parser.add_argument("--nodes", type=int)
+    parser.add_argument("--duration", type=float, help="simulated seconds")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--load-tps", type=float, help="bets per second per node")
+    parser.add_argument("--load-profile", choices=PROFILES)
+    parser.add_argument(
+        "--bets-per-tx", type=parse_bets_per_tx, help="bets per signed batch"
+    )
+    parser.add_argument("--mining", choices=MINING_MODES)
+    parser.add_argument("--difficulty", type=int, help="leading hex zeros per block")
+    parser.add_argument("--output", default="sim_output", help="node logs and data/ go here")
+    parser.add_argument(
+        "--strict", action="store_true", help="exit 1 when the nodes' chains diverge"
+    )
+    args = parser.parse_args()
+
+    scenario = {
+        "nodes": 100,
+        "duration": 120.0,
+        "seed": 0,
+        "network": {},
+        "load": {},
+        "mining": "single",
+        "difficulty": DEFAULT_DIFFICULTY,
+    }
+    if args.scenario:
+        with open(args.scenario) as fh:
+            scenario.update(json.load(fh))
+    for key in ("nodes", "duration", "seed", "mining", "difficulty"):
+        if getattr(args, key) is not None:
+            scenario[key] = getattr(args, key)
+    if args.load_tps is not None:
+        scenario["load"]["tps"] = args.load_tps
+    if args.load_profile is not None:
+        scenario["load"]["profile"] = args.load_profile
+    if args.bets_per_tx is not None:
+        scenario["load"]["bets_per_tx"] = args.bets_per_tx
+
+    os.makedirs(args.output, exist_ok=True)
+    os.chdir(args.output)
+
+    loop = VirtualTimeLoop()
+    started = time.perf_counter()
+    # Node chatter goes to a file, the report to the terminal
+    with open("nodes.log", "w") as log, contextlib.redirect_stdout(log):
+        logging.basicConfig(stream=log, format="%(message)s")
+        logging.getLogger("community").setLevel(logging.INFO)
+        try:
+            report = loop.run_until_complete(
+                run(
+                    scenario["nodes"],
+                    scenario["duration"],
+                    scenario["seed"],
+                    scenario["network"],
+                    scenario["load"],
+                    scenario["mining"],
+                    scenario["difficulty"],
+                )
+            )
+        finally:
+            loop.close()
+    report["wall_seconds"] = time.perf_counter() - started
+    print(json.dumps(report, indent=2))
+
+    consensus = report["consensus"]
+    if consensus["diverged_nodes"] or consensus["distinct_genesis"] > 1:
+        print(
+            f"[!] chains disagree past block {consensus['common_prefix']}: "
+            f"{len(consensus['diverged_nodes'])} nodes off the reference chain, "
+            f"{consensus['distinct_genesis']} genesis blocks, "
+            f"{consensus['miners']} miners",
+            file=sys.stderr,
+        )
+        if args.strict:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import random
+from asyncio import get_running_loop
+from typing import Dict, List, Optional, Set, Tuple
+
+from ipv8.test.mocking.endpoint import AutoMockEndpoint, internet
+
+
+def parse_nodes(selector: list) -> Set[str]:
+    """`[1, 4, "10-20"]` → {"node_1", "node_4", "node_10", ..., "node_20"}"""
+    nodes = set()
+    for item in selector:
+        if isinstance(item, str) and "-" in item:
+            low, high = (int(part) for part in item.split("-", 1))
+            nodes.update(f"node_{i}" for i in range(low, high + 1))
+        else:
+            nodes.add(f"node_{int(item)}")
+    return nodes
+
+
+class LatencyModel:
+    """One-way delay in seconds: constant, uniform, normal or lognormal."""
+
+    def __init__(self, spec: Optional[dict] = None) -> None:
+        spec = spec or {"distribution": "constant", "value": 0.0}
+        self.distribution = spec.get("distribution", "constant")
+        self.spec = spec
+        if self.distribution not in ("constant", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {self.distribution}")
+
+    def sample(self, rng: random.Random) -> float:
+        spec = self.spec
+        if self.distribution == "constant":
+            return spec.get("value", 0.0)
+        if self.distribution == "uniform":
+            return rng.uniform(spec["low"], spec["high"])
+        if self.distribution == "normal":
+            return max(0.0, rng.gauss(spec["mean"], spec["std"]))
+        # lognormal, parameterised by its median
+        return rng.lognormvariate(0.0, spec["sigma"]) * spec["median"]
+
+
+class LinkProfile:
+    def __init__(self, spec: Optional[dict] = None) -> None:
+        spec = spec or {}
+        self.latency = LatencyModel(spec.get("latency"))
+        self.loss = spec.get("loss", 0.0)
+
+
+class Partition:
+    def __init__(self, spec: dict) -> None:
+        self.start = spec["start"]
+        self.end = spec.get("end", float("inf"))
+        self.groups = [parse_nodes(group) for group in spec["groups"]]
+
+    def _group_of(self, node_id: str) -> int:
+        for index, group in enumerate(self.groups):
+            if node_id in group:
+                return index
+        return -1  # Unlisted nodes form one extra group together
+
+    def separates(self, src: str, dst: str, now: float) -> bool:
+        if not self.start <= now < self.end:
+            return False
+        return self._group_of(src) != self._group_of(dst)
+
+
+class NetworkConditions:
+    """
+    Link behaviour for the simulated transport, loaded from a scenario file
+
+        "network": {
+            "default": {"latency": {"distribution": "lognormal", "median": 0.05, "sigma": 0.4},
+                        "loss": 0.01},
+            "links": [{"from": ["1-10"], "to": ["11-20"], "loss": 0.2}],
+            "bandwidth": {"default": 1000000, "nodes": {"node_1": 125000}},
+            "partitions": [{"start": 30, "end": 60, "groups": [["1-50"], ["51-100"]]}]
+        }
+
+    Bandwidth is bytes/second of uplink per node, shared by all its links.
+    Times are simulated seconds since the start of the run.
+    """
+
+    def __init__(self, spec: Optional[dict] = None, seed: int = 0) -> None:
+        spec = spec or {}
+        self.rng = random.Random(seed)
+        self.default = LinkProfile(spec.get("default"))
+        self.links: List[Tuple[Set[str], Set[str], LinkProfile]] = [
+            (parse_nodes(link["from"]), parse_nodes(link["to"]), LinkProfile(link))
+            for link in spec.get("links", [])
+        ]
+        bandwidth = spec.get("bandwidth", {})
+        self.default_bandwidth: Optional[float] = bandwidth.get("default")
+        self.node_bandwidth: Dict[str, float] = bandwidth.get("nodes", {})
+        self.partitions = [Partition(p) for p in spec.get("partitions", [])]
+        self._profiles: Dict[Tuple[str, str], LinkProfile] = {}
+        self.dropped_loss = 0
+        self.dropped_partition = 0
+
+    def profile(self, src: str, dst: str) -> LinkProfile:
+        key = (src, dst)
+        if key not in self._profiles:
+            profile = self.default
+            for sources, destinations, link in self.links:
+                if src in sources and dst in destinations:
+                    profile = link
+            self._profiles[key] = profile
+        return self._profiles[key]
+
+    def bandwidth(self, node_id: str) -> Optional[float]:
+        return self.node_bandwidth.get(node_id, self.default_bandwidth)
+
+    def partitioned(self, src: str, dst: str, now: float) -> bool:
+        return any(p.separates(src, dst, now) for p in self.partitions)
+
+
+class ConditionedEndpoint(AutoMockEndpoint):
+    """In-memory endpoint that delays, drops and rate-limits by NetworkConditions."""
+
+    def __init__(self, node_id: str, conditions: NetworkConditions) -> None:
+        super().__init__()
+        self.node_id = node_id
+        self.conditions = conditions
+        self._uplink_free_at = 0.0
+        self.bytes_sent = 0
+
+    def send(self, socket_address, packet: bytes) -> None:
+        if not self.is_open():
+            return
+        destination = internet.get(socket_address)
+        if destination is None:
+            return
+        loop = get_running_loop()
+        now = loop.time()
+        conditions = self.conditions
+        dst_id = getattr(destination, "node_id", "")
+        if conditions.partitioned(self.node_id, dst_id, now):
+            conditions.dropped_partition += 1
+            return
+        profile = conditions.profile(self.node_id, dst_id)
+        if profile.loss and conditions.rng.random() < profile.loss:
+            conditions.dropped_loss += 1
+            return
+        self.bytes_sent += len(packet)
+        departure = now
+        bandwidth = conditions.bandwidth(self.node_id)
+        if bandwidth:
+            departure = max(now, self._uplink_free_at) + len(packet) / bandwidth
+            self._uplink_free_at = departure
+        delay = departure - now + profile.latency.sample(conditions.rng)
+        loop.call_later(delay, destination.notify_listeners, (self.wan_address, packet))
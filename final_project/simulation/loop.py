@@ -0,0 +1,33 @@
+import asyncio
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop with a virtual clock
+    Whenever nothing is ready to run, time jumps straight to the next
+    scheduled timer, so a simulated minute costs only the CPU it uses
+    Executor work runs inline, a thread finishing at some wall-clock moment
+    would otherwise let virtual time jump by a different amount every run
+    """
+
+    def __init__(self, start: float = 0.0) -> None:
+        super().__init__()
+        self._virtual_time = start
+
+    def time(self) -> float:
+        return self._virtual_time
+
+    def _run_once(self) -> None:
+        if not self._ready and self._scheduled:
+            when = self._scheduled[0]._when
+            if when > self._virtual_time:
+                self._virtual_time = when
+        super()._run_once()
+
+    def run_in_executor(self, executor, func, *args) -> asyncio.Future:
+        future = self.create_future()
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
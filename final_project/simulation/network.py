@@ -0,0 +1,250 @@
+import asyncio
+import random
+from typing import Dict, List, Optional
+
+from ipv8.keyvault.crypto import default_eccrypto
+from ipv8.peer import Peer
+from ipv8.peerdiscovery.network import Network
+from ipv8.test.mocking.endpoint import internet
+
+from community.setup import MyCommunity
+from messages.block import Block
+from constant import DEFAULT_DIFFICULTY, LOAD_DURATION
+from simulation.conditions import ConditionedEndpoint, NetworkConditions
+from simulation.recorder import (
+    PropagationRecorder,
+    RecordingBlockChain,
+    RecordingMempool,
+)
+
+
+BOOTSTRAP_CONTACTS = 3  # earlier nodes each new node is introduced to
+WALK_INTERVAL = 0.5  # seconds between random walk steps, as in IPv8
+WALK_TARGET_PEERS = 10  # matches the WalkerDefinition in network/setup.py
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(values),
+        "p50": _percentile(values, 50),
+        "p90": _percentile(values, 90),
+        "p99": _percentile(values, 99),
+        "max": max(values) if values else 0.0,
+    }
+
+
+class Simulation:
+    """
+    N MyCommunity nodes in one process over ipv8's in-memory endpoint
+    Keys, addresses, link behaviour and node behaviour all derive from `seed`
+    """
+
+    def __init__(
+        self,
+        node_count: int,
+        seed: int = 0,
+        conditions: Optional[NetworkConditions] = None,
+        load: Optional[dict] = None,
+        mining_mode: str = "single",
+        difficulty: int = DEFAULT_DIFFICULTY,
+    ) -> None:
+        self.node_count = node_count
+        self.seed = seed
+        self.conditions = conditions or NetworkConditions(seed=seed)
+        # {"tps", "profile", "duration", "bets_per_tx"} per node, see LoadGenerator
+        self.load = load or {}
+        self.mining_mode = mining_mode
+        self.difficulty = difficulty
+        self.recorder = PropagationRecorder()
+        self.nodes: List[MyCommunity] = []
+        self._walk_tasks: List[asyncio.Task] = []
+
+    def _make_peer(self, rng: random.Random) -> Peer:
+        # LibNaCL keys are two 32-byte seeds, so they can come from the RNG
+        key = default_eccrypto.key_from_private_bin(b"LibNaCLSK:" + rng.randbytes(64))
+        return Peer(key)
+
+    def _make_node(self, index: int, rng: random.Random) -> MyCommunity:
+        node_id = f"node_{index + 1}"
+        endpoint = ConditionedEndpoint(node_id, self.conditions)
+        endpoint.open()
+        peer = self._make_peer(rng)
+        peer.address = endpoint.wan_address
+        settings = MyCommunity.settings_class(
+            node_id=node_id,
+            my_peer=peer,
+            endpoint=endpoint,
+            network=Network(),
+            loop_watchdog=False,
+            load_tps=self.load.get("tps"),
+            load_profile=self.load.get("profile", "steady"),
+            load_duration=self.load.get("duration", LOAD_DURATION),
+            load_seed=f"{self.seed}-{node_id}",
+            bets_per_transaction=self.load.get("bets_per_tx", 1),
+            mining_mode=self.mining_mode,
+            difficulty=self.difficulty,
+        )
+        overlay = MyCommunity(settings)
+        overlay.my_estimated_wan = endpoint.wan_address
+        overlay.my_estimated_lan = endpoint.lan_address
+        # Interface discovery runs in a thread pool, which breaks determinism
+        overlay.cancel_pending_task("discover_lan_addresses")
+        # Swap in recording state before anything has touched the chain
+        overlay.tx_mempool = RecordingMempool(self.recorder, node_id)
+        overlay.chain = RecordingBlockChain(
+            overlay.tx_mempool,
+            self.recorder,
+            node_id,
+            fork_choice=True,
+            difficulty=self.difficulty,
+        )
+        return overlay
+
+    async def _walk(self, overlay: MyCommunity, rng: random.Random) -> None:
+        """IPv8's RandomWalk, minus its wall-clock timeouts and unordered choices."""
+        while True:
+            await asyncio.sleep(WALK_INTERVAL)
+            if len(overlay.get_peers()) >= WALK_TARGET_PEERS:
+                continue
+            walkable = sorted(overlay.get_walkable_addresses())
+            if walkable:
+                overlay.walk_to(rng.choice(walkable))
+            else:
+                overlay.get_new_introduction()
+
+    async def start(self) -> None:
+        rng = random.Random(self.seed)
+        random.seed(self.seed)
+        internet.clear()
+        for index in range(self.node_count):
+            node = self._make_node(index, rng)
+            contacts = rng.sample(self.nodes, min(BOOTSTRAP_CONTACTS, len(self.nodes)))
+            self.nodes.append(node)
+            node.started()
+            for contact in contacts:
+                node.walk_to(contact.endpoint.wan_address)
+            walk = self._walk(node, random.Random(rng.random()))
+            self._walk_tasks.append(asyncio.ensure_future(walk))
+
+    async def stop(self) -> None:
+        for task in self._walk_tasks:
+            task.cancel()
+        await asyncio.gather(*self._walk_tasks, return_exceptions=True)
+        for node in self.nodes:
+            node.endpoint.close()
+        await asyncio.gather(*(node.unload() for node in self.nodes))
+
+    def _reference_chain(self, chains: Dict[str, List[str]]) -> List[Block]:
+        """
+        The chain the most nodes are on or behind, longest on a tie. Lagging
+        nodes agree with it, nodes on another fork or genesis do not
+        """
+        def rank(overlay):
+            ref = [b.hash for b in overlay.chain.chain]
+            behind = sum(ref[: len(h)] == h for h in chains.values())
+            return behind, len(ref)
+
+        with_blocks = [o for o in self.nodes if o.chain.chain]
+        if not with_blocks:
+            return []
+        return max(with_blocks, key=rank).chain.chain
+
+    def consensus(self, chains: Dict[str, List[str]], reference: List[str]) -> dict:
+        present = [h for h in chains.values() if h]
+        prefix = 0
+        for column in zip(*present):
+            if len(set(column)) > 1:
+                break
+            prefix += 1
+        return {
+            "reference_length": len(reference),
+            "common_prefix": prefix,
+            "distinct_tips": len({h[-1] for h in present}),
+            "distinct_genesis": len({h[0] for h in present}),
+            "miners": sum(o.is_miner for o in self.nodes),
+            "lottery_broadcasters": sum(o.is_lottery_broadcaster for o in self.nodes),
+            "diverged_nodes": sorted(
+                node for node, h in chains.items() if reference[: len(h)] != h
+            ),
+            "per_node": {
+                node: {"length": len(h), "tip": h[-1][:16] if h else None}
+                for node, h in chains.items()
+            },
+        }
+
+    def report(self, duration: float) -> dict:
+        overlays = self.nodes
+        chains = {o.node_id: [b.hash for b in o.chain.chain] for o in overlays}
+        # Throughput counts the chain the network agrees on, not a lone fork
+        agreed = self._reference_chain(chains)
+        consensus = self.consensus(chains, [b.hash for b in agreed])
+        included = sum(
+            len(block.transactions) + len(block.batches) for block in agreed
+        )
+        bets = sum(
+            len(block.transactions) + sum(len(b.bet_numbers) for b in block.batches)
+            for block in agreed
+        )
+        return {
+            "nodes": self.node_count,
+            "seed": self.seed,
+            "simulated_seconds": duration,
+            "chain_length": len(agreed),
+            "transactions_in_chain": included,
+            "bets_in_chain": bets,
+            "throughput_tx_per_sec": included / duration if duration else 0.0,
+            "peers_per_node": summarize([len(o.get_peers()) for o in overlays]),
+            "network_ready": summarize(
+                [
+                    o.network_ready_at - o.establishment_start_time
+                    for o in overlays
+                    if o.network_ready_at is not None
+                ]
+            ),
+            "block_delay": summarize(self.recorder.block_delays()),
+            "block_full_propagation": summarize(
+                self.recorder.block_full_propagation(self.node_count)
+            ),
+            "tx_delay": summarize(self.recorder.tx_delays()),
+            "tx_full_propagation": summarize(
+                self.recorder.tx_full_propagation(self.node_count)
+            ),
+            "bet_to_block": summarize(self.recorder.inclusion_delays()),
+            "packets_dropped_loss": self.conditions.dropped_loss,
+            "packets_dropped_partition": self.conditions.dropped_partition,
+            "reorgs": sum(o.chain.reorgs for o in overlays),
+            "bytes_sent": summarize([o.endpoint.bytes_sent for o in overlays]),
+            "load": self._load_report(),
+            "consensus": consensus,
+        }
+
+    def _load_report(self) -> dict:
+        reports = [
+            o.load_generator.report()
+            for o in self.nodes
+            if o.load_generator is not None and o.load_generator.sent
+        ]
+        if not reports:
+            return {}
+        return {
+            "nodes_loaded": len(reports),
+            "target_tps": sum(r["target_tps"] for r in reports),
+            "submitted_tps": sum(r["submitted_tps"] for r in reports),
+            "confirmed_tps": sum(r["confirmed_tps"] for r in reports),
+            "transactions_sent": sum(r["transactions_sent"] for r in reports),
+            "bets_sent": sum(
+                r["transactions_sent"] * r["bets_per_tx"] for r in reports
+            ),
+            "unconfirmed": sum(r["unconfirmed"] for r in reports),
+            "max_schedule_lag": max(r["max_schedule_lag"] for r in reports),
+            "mempool_backlog_max": max(r["mempool_backlog"]["max"] for r in reports),
+            "presign_seconds": sum(r["presign_seconds"] for r in reports),
+        }
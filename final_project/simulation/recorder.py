@@ -0,0 +1,113 @@
+from collections import defaultdict
+from typing import Dict, List
+
+from constant import DEFAULT_DIFFICULTY
+from db.mempool import Mempool, Transaction
+from manager.blockchain import BlockChain
+from messages.block import Block
+from utils import clock
+
+
+class PropagationRecorder:
+    """
+    Arrival times of every block and bet at every simulated node
+    block hash → node → arrival, txid → node → arrival
+    """
+
+    def __init__(self) -> None:
+        self.block_created: Dict[str, float] = {}
+        self.block_arrivals: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self.tx_created: Dict[str, float] = {}
+        self.tx_arrivals: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self.tx_included: Dict[str, float] = {}
+
+    def block_seen(self, node_id: str, block: Block) -> None:
+        now = clock.now()
+        self.block_created.setdefault(block.hash, block.timestamp)
+        self.block_arrivals[block.hash].setdefault(node_id, now)
+        for tx in block.transactions + block.batches:
+            self.tx_included.setdefault(tx.txid, now)
+
+    def tx_seen(self, node_id: str, payload: Transaction) -> None:
+        self.tx_created.setdefault(payload.txid, payload.timestamp)
+        self.tx_arrivals[payload.txid].setdefault(node_id, clock.now())
+
+    def block_delays(self) -> List[float]:
+        return [
+            arrival - self.block_created[block_hash]
+            for block_hash, nodes in self.block_arrivals.items()
+            for arrival in nodes.values()
+        ]
+
+    def block_full_propagation(self, node_count: int) -> List[float]:
+        """Time until the last node had each block, for blocks every node got."""
+        return [
+            max(nodes.values()) - self.block_created[block_hash]
+            for block_hash, nodes in self.block_arrivals.items()
+            if len(nodes) >= node_count
+        ]
+
+    def tx_full_propagation(self, node_count: int) -> List[float]:
+        return [
+            max(nodes.values()) - self.tx_created[txid]
+            for txid, nodes in self.tx_arrivals.items()
+            if len(nodes) >= node_count
+        ]
+
+    def tx_delays(self) -> List[float]:
+        return [
+            arrival - self.tx_created[txid]
+            for txid, nodes in self.tx_arrivals.items()
+            for arrival in nodes.values()
+        ]
+
+    def inclusion_delays(self) -> List[float]:
+        return [
+            included - self.tx_created[txid]
+            for txid, included in self.tx_included.items()
+            if txid in self.tx_created
+        ]
+
+
+class RecordingMempool(Mempool):
+    def __init__(self, recorder: PropagationRecorder, node_id: str) -> None:
+        super().__init__()
+        self.recorder = recorder
+        self.node_id = node_id
+
+    def add_transaction(self, txid: str, payload: Transaction) -> bool:
+        added = super().add_transaction(txid, payload)
+        if added:
+            self.recorder.tx_seen(self.node_id, payload)
+        return added
+
+
+class RecordingBlockChain(BlockChain):
+    def __init__(
+        self,
+        mempool: Mempool,
+        recorder: PropagationRecorder,
+        node_id: str,
+        fork_choice: bool = False,
+        difficulty: int = DEFAULT_DIFFICULTY,
+    ):
+        super().__init__(mempool, fork_choice, difficulty)
+        self.recorder = recorder
+        self.node_id = node_id
+
+    def _add_block(self, block: Block):
+        self.recorder.block_seen(self.node_id, block)
+        return super()._add_block(block)
+
+    def connect_block(self, block: Block):
+        self.recorder.block_seen(self.node_id, block)
+        return super().connect_block(block)
+
+    def create_genesis_block(self) -> Block:
+        block = super().create_genesis_block()
+        self.recorder.block_seen(self.node_id, block)
+        return block
+
+    def commit_block(self, block: Block) -> Block:
+        self.recorder.block_seen(self.node_id, block)
+        return super().commit_block(block)
@@ -0,0 +1,99 @@
+import asyncio
+import time
+from collections import defaultdict
+from inspect import iscoroutine
+from typing import Dict
+
+from ipv8.keyvault.crypto import default_eccrypto
+from ipv8.messaging.interfaces.udp.endpoint import UDPv4Address
+from ipv8.peer import Peer
+from ipv8.peerdiscovery.network import Network
+from ipv8.test.mocking.endpoint import MockEndpoint
+
+from community.setup import MyCommunity
+from utils.trace import MESSAGE_NAMES, read_trace
+
+
+class SinkEndpoint(MockEndpoint):
+    """Swallows everything the replayed node tries to send."""
+
+    def __init__(self) -> None:
+        super().__init__(UDPv4Address("127.0.0.1", 1), UDPv4Address("127.0.0.1", 1))
+        self.packets_sent = 0
+
+    def send(self, socket_address, packet: bytes) -> None:
+        self.packets_sent += 1
+
+
+def make_replay_node(node_id: str = "replay") -> MyCommunity:
+    endpoint = SinkEndpoint()
+    endpoint.open()
+    peer = Peer(default_eccrypto.generate_key("curve25519"), endpoint.wan_address)
+    settings = MyCommunity.settings_class(
+        node_id=node_id,
+        my_peer=peer,
+        endpoint=endpoint,
+        network=Network(),
+        loop_watchdog=False,
+    )
+    node = MyCommunity(settings)
+    # Only the traced messages should drive the node
+    node.cancel_all_pending_tasks()
+    return node
+
+
+async def replay(path: str, speed: float = 0.0) -> dict:
+    """
+    Feed a trace through MyCommunity's handlers, one message at a time
+    speed 0 runs flat out, 1 keeps the recorded gaps, 2 halves them, ...
+    """
+    node = make_replay_node()
+    counts: Dict[str, int] = defaultdict(int)
+    handler_seconds: Dict[str, float] = defaultdict(float)
+    first_arrival = None
+    started = time.perf_counter()
+
+    for record in read_trace(path):
+        if speed > 0:
+            if first_arrival is None:
+                first_arrival = record.arrival
+            due = started + (record.arrival - first_arrival) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        handler = node.decode_map[record.msg_id]
+        if handler is None:
+            continue
+        name = MESSAGE_NAMES.get(record.msg_id, str(record.msg_id))
+        source = UDPv4Address(*record.source)
+        handled = time.perf_counter()
+        try:
+            result = handler(source, record.packet)
+            if iscoroutine(result):
+                await result
+        except Exception as e:
+            counts[f"{name}_errors"] += 1
+            print(f"Replay of {name} failed: {e!r}")
+        handler_seconds[name] += time.perf_counter() - handled
+        counts[name] += 1
+
+    elapsed = time.perf_counter() - started
+    total = sum(n for key, n in counts.items() if not key.endswith("_errors"))
+    await node.unload()
+    return {
+        "messages": total,
+        "wall_seconds": elapsed,
+        "messages_per_sec": total / elapsed if elapsed else 0.0,
+        "per_type": {
+            name: {
+                "count": counts[name],
+                "handler_seconds": handler_seconds[name],
+                "avg_us": 1e6 * handler_seconds[name] / counts[name],
+            }
+            for name in handler_seconds
+        },
+        "errors": {k: v for k, v in counts.items() if k.endswith("_errors")},
+        "chain_length": node.chain._get_length(),
+        "mempool_size": len(node.tx_mempool.get_all_transactions()),
+        "packets_sent": node.endpoint.packets_sent,
+    }
@@ -0,0 +1,90 @@
+import os
+import queue
+import threading
+from typing import Callable, Optional
+
+
+class BackgroundWriter:
+    """
+    File writes on a daemon thread, in submission order
+    Consecutive appends to the same file are coalesced into one write, so a
+    burst of small records costs one open/write/close rather than one each.
+    """
+
+    def __init__(self, name: str = "log-writer") -> None:
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def append(self, path: str, text: str) -> None:
+        self._queue.put(("append", path, text))
+
+    def replace(self, path: str, text: str) -> None:
+        """Atomically swaps the file's contents, readers see old or new, never half."""
+        self._queue.put(("replace", path, text))
+
+    def call(self, fn: Callable, *args) -> None:
+        self._queue.put(("call", fn, args))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until everything submitted so far is on disk."""
+        done = threading.Event()
+        self._queue.put(("call", done.set, ()))
+        return done.wait(timeout)
+
+    def _run(self) -> None:
+        while True:
+            jobs = [self._queue.get()]
+            while True:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for job in self._coalesce(jobs):
+                try:
+                    self._execute(job)
+                except Exception as e:  # Keep the writer alive for later jobs
+                    print(f"[WRITER] {job[0]} failed: {e}")
+
+    @staticmethod
+    def _coalesce(jobs: list) -> list:
+        merged = []
+        for job in jobs:
+            previous = merged[-1] if merged else None
+            if (
+                job[0] == "append"
+                and previous is not None
+                and previous[0] == "append"
+                and previous[1] == job[1]
+            ):
+                merged[-1] = ("append", job[1], previous[2] + job[2])
+            else:
+                merged.append(job)
+        return merged
+
+    @staticmethod
+    def _execute(job: tuple) -> None:
+        kind = job[0]
+        if kind == "append":
+            with open(job[1], "a") as fh:
+                fh.write(job[2])
+        elif kind == "replace":
+            tmp_path = f"{job[1]}.tmp"
+            with open(tmp_path, "w") as fh:
+                fh.write(job[2])
+            os.replace(tmp_path, job[1])
+        else:
+            job[1](*job[2])
+
+
+_shared: Optional[BackgroundWriter] = None
+_shared_lock = threading.Lock()
+
+
+def shared_writer() -> BackgroundWriter:
+    """One writer thread per process, however many nodes it runs."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = BackgroundWriter()
+        return _shared
@@ -0,0 +1,15 @@
+import time
+from typing import Callable
+
+
+# Wall clock by default, the simulator swaps in the event loop's virtual time
+_source: Callable[[], float] = time.time
+
+
+def now() -> float:
+    return _source()
+
+
+def use_clock(source: Callable[[], float]) -> None:
+    global _source
+    _source = source
@@ -1,23 +1,106 @@
 import json
 import os
+from typing import Dict, List, Optional, Set, Tuple
+
+from constant import DISCOVERY_COMPACT_EVERY
+from utils.background_writer import BackgroundWriter, shared_writer
+from utils.telemetry import TelemetryClient
 
 
 class PeerDiscoveryTracker:
-    def __init__(self, id):
-        self.path = f"data/{id}/peer_discovery.json"
-        os.makedirs(os.path.dirname(self.path), exist_ok=True)
-        self.data = {}
-        self._save()
+    """
+    Discovered peer edges, kept as sets and logged as JSON Lines
+    Each new edge is one {"sender", "receivers": [receiver]} line appended by
+    the background writer. Every DISCOVERY_COMPACT_EVERY appends the file is
+    swapped for one line per sender. Read it with `DiscoveryLogReader`.
+    With a telemetry client the edges go to the collector and no file is kept.
+    """
 
-    def _save(self):
-        with open(self.path, "w") as f:
-            json.dump(self.data, f, indent=2)
+    def __init__(
+        self,
+        id,
+        writer: Optional[BackgroundWriter] = None,
+        telemetry: Optional[TelemetryClient] = None,
+    ):
+        self.path = f"data/{id}/peer_discovery.jsonl"
+        self.data: Dict[str, Set[str]] = {}
+        self.telemetry = telemetry
+        self.writer = writer or shared_writer()
+        self._appended = 0
+        if telemetry is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.writer.replace(self.path, "")
 
     def update(self, sender: str, receiver: str):
-        self.data.setdefault(sender, [])
-        if receiver not in self.data[sender]:
-            self.data[sender].append(receiver)
-            self._save()
+        receivers = self.data.setdefault(sender, set())
+        if receiver in receivers:
+            return
+        receivers.add(receiver)
+        if self.telemetry is not None:
+            self.telemetry.emit("peer", sender, receiver)
+            return
+        self.writer.append(self.path, _line(sender, [receiver]))
+        self._appended += 1
+        if self._appended >= DISCOVERY_COMPACT_EVERY:
+            self.compact()
+
+    def compact(self):
+        """Queues a rewrite with one line per sender, after the pending appends."""
+        if self.telemetry is not None:
+            return
+        self._appended = 0
+        text = "".join(_line(s, sorted(rs)) for s, rs in self.data.items())
+        self.writer.replace(self.path, text)
+
+    def close(self):
+        self.compact()
 
     def get_edges(self):
         return [(s, r) for s, rs in self.data.items() for r in rs]
+
+
+def _line(sender: str, receivers: List[str]) -> str:
+    return json.dumps({"sender": sender, "receivers": receivers}) + "\n"
+
+
+class DiscoveryLogReader:
+    """
+    Incremental reader for a peer_discovery.jsonl file
+    `poll()` returns only the edges written since the last call. After a
+    compaction (the file was replaced) it reads from the start again, which
+    is harmless because edges are a set.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._offset = 0
+        self._inode = None
+        self._partial = ""
+
+    def poll(self) -> List[Tuple[str, str]]:
+        try:
+            fh = open(self.path)
+        except FileNotFoundError:
+            return []
+        with fh:
+            stat = os.fstat(fh.fileno())
+            if stat.st_ino != self._inode or stat.st_size < self._offset:
+                self._inode, self._offset, self._partial = stat.st_ino, 0, ""
+            if stat.st_size == self._offset:
+                return []
+            fh.seek(self._offset)
+            chunk = fh.read()
+            self._offset = fh.tell()
+        lines = (self._partial + chunk).split("\n")
+        # The writer may be mid-line, keep the tail for the next poll
+        self._partial = lines.pop()
+        edges = []
+        for line in lines:
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            edges.extend((record["sender"], r) for r in record["receivers"])
+        return edges
@@ -0,0 +1,114 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from typing import Dict, Optional, Set
+
+
+# inotify(7) event bits
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+
+def _load_inotify():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class FileWatcher:
+    """
+    Files created, written or renamed into the watched directories
+    Uses inotify on Linux, so `wait()` sleeps until something changes.
+    Elsewhere it falls back to comparing mtimes every `poll_interval`.
+    """
+
+    def __init__(self, poll_interval: float = 1.0) -> None:
+        self.poll_interval = poll_interval
+        self._libc = _load_inotify()
+        self._fd: Optional[int] = None
+        self._dirs: Dict[int, str] = {}  # watch descriptor -> directory
+        self._mtimes: Dict[str, float] = {}  # polling fallback only
+        if self._libc is not None:
+            fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd >= 0:
+                self._fd = fd
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._fd is not None
+
+    def watch(self, directory: str) -> None:
+        if self._fd is None:
+            self._dirs[len(self._dirs)] = directory
+            self._scan(directory)
+            return
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {directory}")
+        self._dirs[wd] = directory
+
+    def wait(self, timeout: Optional[float] = None) -> Set[str]:
+        """Paths that changed, waiting up to `timeout` (None: forever) for one."""
+        if self._fd is None:
+            return self._poll(timeout)
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        pos = 0
+        while pos < len(data):
+            wd, _, _, length = _EVENT_HEADER.unpack_from(data, pos)
+            pos += _EVENT_HEADER.size
+            name = data[pos : pos + length].rstrip(b"\0")
+            pos += length
+            if wd in self._dirs and name:
+                changed.add(os.path.join(self._dirs[wd], os.fsdecode(name)))
+        return changed
+
+    def _scan(self, directory: str) -> Set[str]:
+        changed = set()
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            return changed
+        for entry in entries:
+            mtime = entry.stat().st_mtime
+            if self._mtimes.get(entry.path) != mtime:
+                self._mtimes[entry.path] = mtime
+                changed.add(entry.path)
+        return changed
+
+    def _poll(self, timeout: Optional[float]) -> Set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = set()
+            for directory in list(self._dirs.values()):
+                changed |= self._scan(directory)
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return changed
+            time.sleep(self.poll_interval)
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,92 @@
+import io
+import struct
+from typing import BinaryIO, Optional
+
+from PIL import Image
+
+
+# Loop forever: the NETSCAPE2.0 application extension
+_LOOP_EXTENSION = b"\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00"
+_TRAILER = b"\x3b"
+
+
+def _skip_sub_blocks(data: bytes, pos: int) -> int:
+    while data[pos]:
+        pos += data[pos] + 1
+    return pos + 1
+
+
+class GifStreamWriter:
+    """
+    Animated GIF written one frame at a time, never holding earlier frames
+    Each frame is encoded by Pillow as a single-image GIF, then its image
+    blocks are appended with the palette moved into a local colour table.
+    The trailer is rewritten after every frame, so the file is always a
+    complete, playable GIF.
+    """
+
+    def __init__(self, path: str, delay: float = 0.4) -> None:
+        self.path = path
+        self.delay_cs = max(1, int(round(delay * 100)))
+        self.frames = 0
+        self.size: Optional[tuple] = None
+        self._fh: Optional[BinaryIO] = None
+
+    def append(self, image: Image.Image) -> None:
+        frame = image.convert("RGB").quantize(colors=256)
+        if self._fh is None:
+            self.size = frame.size
+            self._fh = open(self.path, "wb")
+            width, height = frame.size
+            # Logical screen without a global colour table, every frame brings its own
+            self._fh.write(b"GIF89a" + struct.pack("<HHBBB", width, height, 0, 0, 0))
+            self._fh.write(_LOOP_EXTENSION)
+        elif frame.size != self.size:
+            frame = frame.resize(self.size)
+
+        buf = io.BytesIO()
+        frame.save(buf, format="GIF")
+        self._fh.seek(0, io.SEEK_END)
+        if self.frames:
+            self._fh.seek(-len(_TRAILER), io.SEEK_END)
+        self._fh.write(self._frame_blocks(buf.getvalue()))
+        self._fh.write(_TRAILER)
+        self._fh.flush()
+        self.frames += 1
+
+    def _frame_blocks(self, data: bytes) -> bytes:
+        packed = data[10]
+        pos = 13
+        palette = b""
+        if packed & 0x80:
+            palette_size = 3 * (2 ** ((packed & 0x07) + 1))
+            palette, pos = data[pos : pos + palette_size], pos + palette_size
+        out = [
+            # Graphic control: frame delay, keep the previous frame underneath
+            b"\x21\xf9\x04\x04" + struct.pack("<H", self.delay_cs) + b"\x00\x00"
+        ]
+        while pos < len(data) and data[pos] != _TRAILER[0]:
+            if data[pos] == 0x21:  # Pillow's own extensions are dropped
+                pos = _skip_sub_blocks(data, pos + 2)
+                continue
+            # Image descriptor: copy it with the global palette made local
+            descriptor = bytearray(data[pos : pos + 10])
+            pos += 10
+            if palette and not descriptor[9] & 0x80:
+                descriptor[9] = (descriptor[9] & 0x40) | 0x80 | (packed & 0x07)
+                out.append(bytes(descriptor) + palette)
+            else:
+                out.append(bytes(descriptor))
+                if descriptor[9] & 0x80:
+                    size = 3 * (2 ** ((descriptor[9] & 0x07) + 1))
+                    out.append(data[pos : pos + size])
+                    pos += size
+            end = _skip_sub_blocks(data, pos + 1)  # LZW code size, then data
+            out.append(data[pos:end])
+            pos = end
+        return b"".join(out)
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
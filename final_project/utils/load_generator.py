@@ -0,0 +1,173 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from constant import MAX_BATCH_BETS
+from db.mempool import Transaction
+from utils import clock
+
+
+PROFILES = ("steady", "bursty")
+
+
+def emission_schedule(
+    profile: str, tps: float, duration: float, burst_period: float
+) -> List[float]:
+    """
+    Offsets in seconds from the start of the run, one per transaction
+    steady spaces them 1/tps apart, bursty sends each period's share at once
+    """
+    total = int(tps * duration)
+    if profile == "bursty":
+        per_burst = max(1, int(round(tps * burst_period)))
+        return [(i // per_burst) * burst_period for i in range(total)]
+    return [i / tps for i in range(total)]
+
+
+def parse_bets_per_tx(value: str) -> int:
+    """argparse type, peers reject batches above MAX_BATCH_BETS as malformed."""
+    count = int(value)
+    if not 1 <= count <= MAX_BATCH_BETS:
+        raise argparse.ArgumentTypeError(
+            f"bets per transaction must be 1 to {MAX_BATCH_BETS}, got {count}"
+        )
+    return count
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class LoadGenerator:
+    """
+    Submits transactions at a target rate to find where a node saturates
+    Every transaction of the run is built and signed up front, so only the ingest path
+    is on the measured clock. Delays are measured from when a transaction was due.
+    """
+
+    def __init__(
+        self,
+        make_tx: Callable[[List[int], List[int], float], Transaction],
+        submit: Callable[[Transaction], None],
+        backlog: Callable[[], int],
+        tps: float,
+        profile: str = "steady",
+        duration: float = 60.0,
+        burst_period: float = 1.0,
+        seed: Optional[int] = None,
+        bets_per_tx: int = 1,
+    ) -> None:
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown load profile {profile!r}, one of {PROFILES}")
+        if not 1 <= bets_per_tx <= MAX_BATCH_BETS:
+            raise ValueError(f"bets_per_tx must be 1 to {MAX_BATCH_BETS}")
+        self.make_tx = make_tx
+        self.submit = submit
+        self.backlog = backlog
+        self.tps = tps
+        self.profile = profile
+        self.duration = duration
+        self.burst_period = burst_period
+        self.bets_per_tx = bets_per_tx
+        self._rng = random.Random(seed)
+        # (offset from the start of the run, signed transaction)
+        self._pool: Deque[Tuple[float, Transaction]] = deque()
+        # txid -> time the transaction was due, until a block includes it
+        self._issued: Dict[str, float] = {}
+        self.started_at = 0.0
+        self.finished_at = 0.0
+        self.presign_seconds = 0.0
+        self.sent = 0
+        self.max_lag = 0.0
+        self.max_backlog = 0
+        self.last_backlog = 0
+        self.confirm_delays: List[float] = []
+        self.last_confirmed_at = 0.0
+
+    def prepare(self, start: Optional[float] = None) -> None:
+        """Builds and signs the whole run, the slow part, before the clock starts."""
+        began = time.perf_counter()
+        if start is None:
+            start = clock.now()
+        offsets = emission_schedule(
+            self.profile, self.tps, self.duration, self.burst_period
+        )
+        randint = self._rng.randint
+        for offset in offsets:
+            numbers = [randint(1, 100) for _ in range(self.bets_per_tx)]
+            amounts = [randint(1, 100) for _ in range(self.bets_per_tx)]
+            self._pool.append((offset, self.make_tx(numbers, amounts, start + offset)))
+        self.presign_seconds = time.perf_counter() - began
+
+    async def prepare_async(self) -> None:
+        """`prepare()` on an executor thread, the loop keeps handling messages."""
+        loop = asyncio.get_running_loop()
+        # The clock is read here, the simulator's virtual one only on its loop
+        await loop.run_in_executor(None, self.prepare, clock.now())
+
+    async def run(self) -> None:
+        self.started_at = clock.now()
+        while self._pool:
+            delay = self.started_at + self._pool[0][0] - clock.now()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            now = clock.now()
+            # Everything already due goes out before yielding, as a burst would
+            while self._pool and self.started_at + self._pool[0][0] <= now:
+                offset, tx = self._pool.popleft()
+                due = self.started_at + offset
+                self.submit(tx)
+                self._issued[tx.txid] = due
+                self.sent += 1
+                self.max_lag = max(self.max_lag, now - due)
+            self.last_backlog = self.backlog()
+            self.max_backlog = max(self.max_backlog, self.last_backlog)
+        self.finished_at = clock.now()
+
+    def observe_block(self, transactions: List[Transaction]) -> None:
+        now = clock.now()
+        for tx in transactions:
+            due = self._issued.pop(tx.txid, None)
+            if due is not None:
+                self.confirm_delays.append(now - due)
+                self.last_confirmed_at = now
+
+    def report(self) -> dict:
+        end = self.finished_at or clock.now()
+        # The last steady transaction or burst is due before `duration` has passed
+        elapsed = max(end - self.started_at, self.duration if self.finished_at else 0)
+        delays = sorted(self.confirm_delays)
+        # Bets handed to our mempool are not yet throughput, only those a block
+        # took count, over the time until the last of them was confirmed
+        confirming = self.last_confirmed_at - self.started_at
+        return {
+            "profile": self.profile,
+            "target_tps": self.tps,
+            "bets_per_tx": self.bets_per_tx,
+            "transactions_sent": self.sent,
+            "presign_seconds": self.presign_seconds,
+            "submitted_tps": self.sent / elapsed if elapsed > 0 else 0.0,
+            "confirmed_tps": len(delays) / confirming if confirming > 0 else 0.0,
+            "max_schedule_lag": self.max_lag,
+            "mempool_backlog": {"last": self.last_backlog, "max": self.max_backlog},
+            "bet_to_block": {
+                "count": len(delays),
+                "p50": _percentile(delays, 50),
+                "p90": _percentile(delays, 90),
+                "p99": _percentile(delays, 99),
+                "max": delays[-1] if delays else 0.0,
+            },
+            "unconfirmed": len(self._issued),
+        }
+
+    def dump(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as fh:
+            json.dump(self.report(), fh, indent=2)
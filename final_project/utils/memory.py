@@ -0,0 +1,82 @@
+import sys
+import tracemalloc
+from typing import Dict, Optional, Tuple
+
+
+def deep_sizeof(
+    obj, skip: Tuple[type, ...] = (), limit: Optional[int] = None
+) -> Tuple[int, int]:
+    """
+    Approximate (bytes, objects) reachable from `obj`
+    Follows containers and instance __dict__s, counts shared objects once,
+    and does not descend into instances of `skip`. Stops after `limit` objects
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    count = 0
+    while stack and (limit is None or count < limit):
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        count += 1
+        if isinstance(item, (str, bytes, int, float, bool, type(None))):
+            continue
+        if skip and isinstance(item, skip):
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, "__dict__"):
+            stack.append(item.__dict__)
+    return total, count
+
+
+class MemorySnapshots:
+    """
+    tracemalloc snapshots for diffing allocations between two points in time
+    Tracing starts on the first snapshot, since it slows allocation down
+    """
+
+    def __init__(self, frames: int = 5) -> None:
+        self.frames = frames
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    def snapshot(self, top: int = 25) -> str:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._previous = tracemalloc.take_snapshot()
+            return "tracemalloc started, request again for a diff\n"
+        current = tracemalloc.take_snapshot()
+        stats = current.compare_to(self._previous, "lineno")
+        self._previous = current
+        traced, peak = tracemalloc.get_traced_memory()
+        lines = [f"traced {traced} bytes, peak {peak} bytes, top {top} changes:"]
+        lines += [str(stat) for stat in stats[:top]]
+        return "\n".join(lines) + "\n"
+
+    def stop(self) -> None:
+        self._previous = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def component_report(
+    components: Dict[str, object],
+    skip: Tuple[type, ...] = (),
+    limit: Optional[int] = None,
+) -> dict:
+    """Sizes per component, `truncated` when the walk hit `limit` objects."""
+    report = {}
+    for name, obj in components.items():
+        size, objects = deep_sizeof(obj, skip, limit)
+        report[name] = {
+            "bytes": size,
+            "objects": objects,
+            "truncated": limit is not None and objects >= limit,
+        }
+    return report
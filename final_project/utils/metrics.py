@@ -0,0 +1,148 @@
+import bisect
+import time
+from collections import defaultdict
+from inspect import iscoroutine
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from aiohttp import web
+
+
+# Seconds, 100µs up to 1s, enough resolution for message handlers and mining
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str = "") -> List[str]:
+        sep = "," if labels else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+class NodeMetrics:
+    """
+    Per-node counters, histograms and scrape-time gauges
+    Hot paths only do a few integer adds and one bisect per observation,
+    gauges are computed when `/metrics` is scraped
+    """
+
+    def __init__(self) -> None:
+        self.messages: Dict[str, int] = defaultdict(int)
+        self.message_bytes: Dict[str, int] = defaultdict(int)
+        self.handler_latency: Dict[str, Histogram] = defaultdict(Histogram)
+        self.block_interval = Histogram()
+        self._gauges: List[Tuple[str, str, Callable[[], float]]] = []
+        self._counters: List[Tuple[str, str, Callable[[], float]]] = []
+        self._histograms: List[Tuple[str, str, Histogram]] = [
+            (
+                "axiom_block_interval_seconds",
+                "Time between consecutive blocks",
+                self.block_interval,
+            )
+        ]
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]) -> None:
+        self._gauges.append((name, help_text, read))
+
+    def counter(self, name: str, help_text: str, read: Callable[[], float]) -> None:
+        self._counters.append((name, help_text, read))
+
+    def histogram(self, name: str, help_text: str, histogram: Histogram) -> None:
+        self._histograms.append((name, help_text, histogram))
+
+    def instrument(self, message_type: str, handler: Callable) -> Callable:
+        """Wraps a decode_map handler to count and time it, awaiting async handlers."""
+        latency = self.handler_latency[message_type]
+
+        async def timed(result, started: float) -> None:
+            try:
+                await result
+            finally:
+                latency.observe(time.perf_counter() - started)
+
+        def wrapper(source_address, data: bytes):
+            self.messages[message_type] += 1
+            self.message_bytes[message_type] += len(data)
+            started = time.perf_counter()
+            result = handler(source_address, data)
+            if iscoroutine(result):
+                return timed(result, started)
+            latency.observe(time.perf_counter() - started)
+            return result
+
+        return wrapper
+
+    def render(self) -> str:
+        lines = [
+            "# HELP axiom_messages_total Messages handled, by type",
+            "# TYPE axiom_messages_total counter",
+        ]
+        for kind, count in self.messages.items():
+            lines.append(f'axiom_messages_total{{type="{kind}"}} {count}')
+        lines += [
+            "# HELP axiom_message_bytes_total Bytes of handled messages, by type",
+            "# TYPE axiom_message_bytes_total counter",
+        ]
+        for kind, size in self.message_bytes.items():
+            lines.append(f'axiom_message_bytes_total{{type="{kind}"}} {size}')
+        lines += [
+            "# HELP axiom_handler_seconds Message handler latency, by type",
+            "# TYPE axiom_handler_seconds histogram",
+        ]
+        for kind, histogram in self.handler_latency.items():
+            lines += histogram.render("axiom_handler_seconds", f'type="{kind}"')
+        for name, help_text, histogram in self._histograms:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            lines += histogram.render(name)
+        for kind, metrics in (("counter", self._counters), ("gauge", self._gauges)):
+            for name, help_text, read in metrics:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {read()}")
+        return "\n".join(lines) + "\n"
+
+
+async def start_metrics_server(
+    metrics: NodeMetrics,
+    port: int,
+    host: str = "127.0.0.1",
+    routes: Iterable[Tuple[str, Callable]] = (),
+) -> web.AppRunner:
+    """Serves `metrics.render()` at http://host:port/metrics, plus any extra GET routes."""
+
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(
+            text=metrics.render(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    for path, route_handler in routes:
+        app.router.add_get(path, route_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
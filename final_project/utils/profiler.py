@@ -0,0 +1,61 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Optional
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def fold_stack(frame: Optional[FrameType]) -> str:
+    """Root-first `file:function;file:function` line, as flamegraph.pl expects."""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack at a fixed interval from another thread
+    The result is in collapsed (folded) format: `stack count` per line
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+
+    def sample(self, seconds: float) -> Counter:
+        stacks: Counter = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                stacks[fold_stack(frame)] += 1
+            time.sleep(self.interval)
+        return stacks
+
+
+def folded(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def sample_in_background(thread_id: int, seconds: float, path: str) -> threading.Thread:
+    """Samples `thread_id` for `seconds` on a daemon thread and writes folded stacks to `path`."""
+
+    def run() -> None:
+        stacks = StackSampler(thread_id).sample(seconds)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as fh:
+            fh.write(folded(stacks))
+        print(f"Profile written to {path} ({sum(stacks.values())} samples)")
+
+    thread = threading.Thread(target=run, name="stack-sampler", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,198 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from constant import (
+    TELEMETRY_FLUSH_INTERVAL,
+    TELEMETRY_MAX_BUFFER,
+    TELEMETRY_QUEUE_SIZE,
+    TELEMETRY_REORDER_WINDOW,
+)
+from utils import clock
+
+
+# One row per event: time, node, kind, then three kind-specific values
+#   peer: sender mid, receiver mid
+#   tx:   txid, round, bet timestamp (t is the local arrival)
+#   round: round number of a closed round
+#   result: round, winning number, total amount (lottery broadcaster only),
+#           a later row for the same round replaces it after a reorg
+COLUMNS = ("t", "node", "kind", "a", "b", "c")
+
+
+class TelemetryClient:
+    """
+    Streams a node's events to the collector over a Unix socket
+    `emit()` only appends to a bounded deque, the oldest events are dropped
+    when it is full. A loop task sends everything queued as one line every
+    `interval`, and skips a tick rather than wait when the socket is backed up,
+    so a slow or missing collector never stalls the node.
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        node_id: str,
+        capacity: int = TELEMETRY_QUEUE_SIZE,
+        interval: float = TELEMETRY_FLUSH_INTERVAL,
+    ) -> None:
+        self.socket_path = socket_path
+        self.node_id = node_id
+        self.interval = interval
+        self.events: deque = deque(maxlen=capacity)
+        self.sent = 0
+        self.dropped = 0
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    def emit(self, kind: str, a="", b="", c=0.0) -> None:
+        if len(self.events) == self.events.maxlen:
+            self.dropped += 1
+        self.events.append((clock.now(), kind, a, b, c))
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.send()
+
+    async def send(self, force: bool = False) -> None:
+        """One batch of everything queued, `force` sends even when backed up."""
+        if not self.events:
+            return
+        if self._writer is None or self._writer.is_closing():
+            try:
+                _, self._writer = await asyncio.open_unix_connection(self.socket_path)
+            except OSError:
+                self._writer = None
+                return  # Collector not up yet, keep queuing
+        buffered = self._writer.transport.get_write_buffer_size()
+        if buffered > TELEMETRY_MAX_BUFFER and not force:
+            return  # Collector is behind, the deque absorbs it
+        batch = list(self.events)
+        self.events.clear()
+        line = json.dumps({"node": self.node_id, "events": batch}) + "\n"
+        self._writer.write(line.encode())
+        self.sent += len(batch)
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """Sends what is left and waits for it to leave the socket buffer."""
+        await self.send(force=True)
+        if self._writer is None:
+            return
+        try:
+            await asyncio.wait_for(self._writer.drain(), timeout)
+        except (ConnectionError, asyncio.TimeoutError):
+            pass  # Collector gone or stuck, nothing more to do
+        self._writer.close()
+        self._writer = None
+
+
+class TelemetryCollector:
+    """
+    Merges every node's events into one time-ordered columnar log
+    Events wait `window` seconds for stragglers, then each second the ready
+    ones are sorted by time and appended as one line of columns, see COLUMNS.
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        out_path: str,
+        window: float = TELEMETRY_REORDER_WINDOW,
+    ) -> None:
+        self.socket_path = socket_path
+        self.out_path = out_path
+        self.window = window
+        self.received = 0
+        self.written = 0
+        self._pending: List[tuple] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def serve(self, chunk_interval: float = 1.0) -> None:
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        os.makedirs(os.path.dirname(self.out_path) or ".", exist_ok=True)
+        self._server = await asyncio.start_unix_server(
+            self._handle, self.socket_path, limit=16 * 1024 * 1024
+        )
+        try:
+            while True:
+                await asyncio.sleep(chunk_interval)
+                self.write_ready(time.time() - self.window)
+        finally:
+            self._server.close()
+            self.write_ready(float("inf"))
+
+    async def _handle(self, reader: asyncio.StreamReader, writer) -> None:
+        try:
+            async for line in reader:
+                try:
+                    batch = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                node = batch["node"]
+                for t, kind, a, b, c in batch["events"]:
+                    self._pending.append((t, node, kind, a, b, c))
+                self.received += len(batch["events"])
+        except (ConnectionError, asyncio.CancelledError):
+            pass  # Node went away, or the collector is shutting down
+        finally:
+            writer.close()
+
+    def write_ready(self, cutoff: float) -> int:
+        ready = [e for e in self._pending if e[0] <= cutoff]
+        if not ready:
+            return 0
+        self._pending = [e for e in self._pending if e[0] > cutoff]
+        ready.sort(key=lambda e: e[0])
+        chunk = dict(zip(COLUMNS, map(list, zip(*ready))))
+        with open(self.out_path, "a") as fh:
+            fh.write(json.dumps(chunk) + "\n")
+        self.written += len(ready)
+        return len(ready)
+
+
+def read_chunks(path: str) -> Iterator[Dict[str, list]]:
+    """Each chunk is a dict of equal-length columns, in time order."""
+    with open(path) as fh:
+        for line in fh:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                return  # A chunk still being written
+
+
+def read_new_chunks(path: str, offset: int = 0) -> Tuple[List[dict], int]:
+    """Chunks appended since `offset`, and the offset to resume from."""
+    chunks = []
+    try:
+        with open(path, "rb") as fh:
+            fh.seek(offset)
+            for line in fh:
+                if not line.endswith(b"\n"):
+                    break  # Still being written
+                offset += len(line)
+                try:
+                    chunks.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    except FileNotFoundError:
+        pass  # Collector has not written its first chunk yet
+    return chunks, offset
+
+
+def read_columns(path: str, kind: Optional[str] = None) -> Dict[str, list]:
+    """The whole log as columns, optionally only one kind of event."""
+    columns: Dict[str, list] = {name: [] for name in COLUMNS}
+    for chunk in read_chunks(path):
+        if kind is None:
+            for name in COLUMNS:
+                columns[name].extend(chunk[name])
+            continue
+        keep = [i for i, k in enumerate(chunk["kind"]) if k == kind]
+        for name in COLUMNS:
+            values = chunk[name]
+            columns[name].extend(values[i] for i in keep)
+    return columns
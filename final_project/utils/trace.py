@@ -0,0 +1,90 @@
+import os
+import struct
+from typing import BinaryIO, Iterator, NamedTuple, Optional
+
+from utils import clock
+
+
+TRACE_MAGIC = b"AVTRACE1"
+# arrival time, message id, source host length, source port, packet length
+_RECORD_HEADER = struct.Struct(">dBHHI")
+
+# Every message type of ours, see MESSAGE_NAMES
+TRACED_MESSAGE_IDS = {1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12}
+MESSAGE_NAMES = {
+    1: "BetPayload",
+    2: "TransactionsRequest",
+    3: "TransactionsResponse",
+    4: "Block",
+    5: "BetBatchPayload",
+    6: "LotteryResult",
+    7: "PoolJoin",
+    8: "MiningJob",
+    9: "MiningResult",
+    10: "JobClosed",
+    11: "PeerView",
+    12: "BlocksRequest",
+}
+_MSG_ID_OFFSET = 22  # after the community prefix
+
+
+class TraceRecord(NamedTuple):
+    arrival: float
+    msg_id: int
+    source: tuple
+    packet: bytes
+
+
+class TraceWriter:
+    """
+    Appends inbound packets of our own message types to a binary trace
+    Writes go through a large file buffer, the owner calls `flush()` on a
+    timer so a killed node leaves a readable trace, `close()` flushes the rest
+    """
+
+    def __init__(self, path: str, buffer_size: int = 1 << 20) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._fh: Optional[BinaryIO] = open(path, "wb", buffering=buffer_size)
+        self._fh.write(TRACE_MAGIC)
+        self._fh.flush()  # Readable as an empty trace from the start
+        self.records = 0
+
+    def record(self, source: tuple, packet: bytes) -> None:
+        if self._fh is None or len(packet) <= _MSG_ID_OFFSET:
+            return
+        msg_id = packet[_MSG_ID_OFFSET]
+        if msg_id not in TRACED_MESSAGE_IDS:
+            return
+        host = source[0].encode()
+        self._fh.write(
+            _RECORD_HEADER.pack(clock.now(), msg_id, len(host), source[1], len(packet))
+        )
+        self._fh.write(host)
+        self._fh.write(packet)
+        self.records += 1
+
+    def flush(self) -> None:
+        if self._fh is not None:
+            self._fh.flush()
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+def read_trace(path: str) -> Iterator[TraceRecord]:
+    with open(path, "rb") as fh:
+        if fh.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+            raise ValueError(f"{path} is not a message trace")
+        while True:
+            header = fh.read(_RECORD_HEADER.size)
+            if len(header) < _RECORD_HEADER.size:
+                return
+            arrival, msg_id, host_len, port, packet_len = _RECORD_HEADER.unpack(header)
+            host = fh.read(host_len).decode()
+            packet = fh.read(packet_len)
+            if len(packet) < packet_len:
+                return  # Truncated tail of a trace still being written
+            yield TraceRecord(arrival, msg_id, (host, port), packet)
@@ -1,32 +1,70 @@
 import json
 import os
 from collections import defaultdict
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from utils import clock
+from utils.background_writer import BackgroundWriter, shared_writer
+from utils.telemetry import TelemetryClient
+
+
+LOG_NAME = "transactions_log.jsonl"
+INDEX_NAME = "transactions_log.idx"
 
 
 class TxCoverageTracker:
     """
     Round-scoped transaction logger for each node
-    `record(round_id, tx_id, tx_ts)` for every seen transaction
-    `flush(round_id)` when a round ends
-    `dump(node_id)` to write to disk
+    `record(round_id, tx_id, tx_ts)` for every seen transaction, stamped with
+    the local arrival time
+    `flush(round_id)` when a round ends, which appends the round as one JSON
+    line to data/<node>/transactions_log.jsonl and "round offset length" to
+    transactions_log.idx, both on the background writer thread
+    Only rounds that have not been flushed yet are held in memory
+    With a telemetry client every sighting goes to the collector as it happens
+    and nothing is held or written here
     """
 
-    def __init__(self, node_name: str) -> None:
+    def __init__(
+        self,
+        node_name: str,
+        writer: Optional[BackgroundWriter] = None,
+        telemetry: Optional[TelemetryClient] = None,
+    ):
         self.node_name = node_name
-        # round_id → { tx_hash → ts }
-        self._seen: Dict[int, Dict[str, float]] = defaultdict(dict)
-        self._history: List[dict] = []
+        # round_id → { tx_hash → (ts, arrived) }
+        self._seen: Dict[int, Dict[str, Tuple[float, float]]] = defaultdict(dict)
+        dir_path = os.path.join("data", node_name)
+        self.path = os.path.join(dir_path, LOG_NAME)
+        self.index_path = os.path.join(dir_path, INDEX_NAME)
+        self.telemetry = telemetry
+        self.writer = writer or shared_writer()
+        if telemetry is None:
+            os.makedirs(dir_path, exist_ok=True)
+            self.writer.replace(self.path, "")
+            self.writer.replace(self.index_path, "")
 
     def record(self, round_id: int, tx_id: str, tx_ts: float) -> None:
-        self._seen[round_id][tx_id] = tx_ts
+        if self.telemetry is not None:
+            self.telemetry.emit("tx", tx_id, round_id, tx_ts)
+            return
+        self._seen[round_id][tx_id] = (tx_ts, clock.now())
 
     def flush(self, round_id: int) -> None:
+        if self.telemetry is not None:
+            self.telemetry.emit("round", round_id)
+            return
+        # Bets recorded against an already closed round go out with this one,
+        # as their own record, so nothing lingers in memory
+        for closed in sorted(r for r in self._seen if r <= round_id):
+            self._flush_round(closed)
+
+    def _flush_round(self, round_id: int) -> None:
         tx_map = self._seen.pop(round_id, {})
         ordered = sorted(tx_map.items(), key=lambda kv: kv[1])
         transactions = {
-            tx_hash: {"order": i + 1, "timestamp": ts}
-            for i, (tx_hash, ts) in enumerate(ordered)
+            tx_hash: {"order": i + 1, "timestamp": ts, "arrived": arrived}
+            for i, (tx_hash, (ts, arrived)) in enumerate(ordered)
         }
         entry = {
             "round": round_id,
@@ -34,12 +72,52 @@ class TxCoverageTracker:
             "node_name": self.node_name,
             "transactions": transactions,
         }
-        self._history.append(entry)
-
-    def dump(self) -> str:
-        dir_path = os.path.join("data", self.node_name)
-        os.makedirs(dir_path, exist_ok=True)
-        file_path = os.path.join(dir_path, "transactions_log.json")
-        with open(file_path, "w") as fh:
-            json.dump(self._history, fh, indent=2)
-        return os.path.abspath(file_path)
+        line = (json.dumps(entry) + "\n").encode()
+        self.writer.call(self._write_round, round_id, line)
+
+    def _write_round(self, round_id: int, line: bytes) -> None:
+        """Writer thread only, so the offset is stable between tell() and write()."""
+        with open(self.path, "ab") as fh:
+            offset = fh.tell()
+            fh.write(line)
+        with open(self.index_path, "a") as fh:
+            fh.write(f"{round_id} {offset} {len(line)}\n")
+
+
+def read_index(node_dir: str) -> Dict[int, List[Tuple[int, int]]]:
+    """round → [(offset, length), ...] in the order the records were written."""
+    index = defaultdict(list)
+    path = os.path.join(node_dir, INDEX_NAME)
+    if not os.path.exists(path):
+        return index
+    with open(path) as fh:
+        for line in fh:
+            parts = line.split()
+            if len(parts) == 3:
+                round_id, offset, length = map(int, parts)
+                index[round_id].append((offset, length))
+    return index
+
+
+def read_round(node_dir: str, round_id: int, index=None) -> List[dict]:
+    """Every record for one round, read straight from its offsets."""
+    index = index if index is not None else read_index(node_dir)
+    records = []
+    with open(os.path.join(node_dir, LOG_NAME), "rb") as fh:
+        for offset, length in index.get(round_id, []):
+            fh.seek(offset)
+            records.append(json.loads(fh.read(length)))
+    return records
+
+
+def iter_rounds(node_dir: str) -> Iterator[dict]:
+    """Streams every record in write order, one line in memory at a time."""
+    path = os.path.join(node_dir, LOG_NAME)
+    if not os.path.exists(path):
+        return
+    with open(path) as fh:
+        for line in fh:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                return  # A record still being written
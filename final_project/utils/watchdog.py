@@ -0,0 +1,91 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, NamedTuple, Optional
+
+from utils.metrics import Histogram
+
+
+class Stall(NamedTuple):
+    at: float
+    blocked_for: float
+    stack: str
+
+
+class LoopWatchdog:
+    """
+    Measures event loop scheduling lag and catches callbacks that block it
+    The loop posts a heartbeat every `interval`. A daemon thread checks
+    the heartbeat, and when it is older than `threshold` it grabs the
+    loop thread's stack, which is the stack of the blocking callback.
+    """
+
+    def __init__(
+        self, threshold: float = 0.1, interval: float = 0.05, keep: int = 20
+    ) -> None:
+        self.threshold = threshold
+        self.interval = interval
+        self.lag = Histogram()
+        self.stalls: Deque[Stall] = deque(maxlen=keep)
+        self.stall_count = 0
+        self.max_lag = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._expected = 0.0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def loop_thread_id(self) -> Optional[int]:
+        return self._loop_thread_id
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._schedule()
+        self._thread = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _schedule(self) -> None:
+        self._last_beat = time.monotonic()
+        self._expected = self._last_beat + self.interval
+        self._handle = self._loop.call_later(self.interval, self._beat)
+
+    def _beat(self) -> None:
+        lag = max(0.0, time.monotonic() - self._expected)
+        self.lag.observe(lag)
+        self.max_lag = max(self.max_lag, lag)
+        self._schedule()
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stop.wait(self.interval):
+            beat = self._last_beat
+            blocked_for = time.monotonic() - beat - self.interval
+            if blocked_for < self.threshold or beat == reported_beat:
+                continue
+            # One stack per stall, taken while the callback is still running
+            reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame))
+            self.stalls.append(Stall(time.time(), blocked_for, stack))
+            self.stall_count += 1
+            print(
+                f"[WATCHDOG] Event loop blocked for {blocked_for * 1000:.0f}ms in:\n{stack}"
+            )